@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for country-page extraction: pages/sec of the legacy
+double-parse + FIELD_PATTERNS path vs. the single-parse engine per backend.
+The corpus is the crawler's page store, or any directory of saved *.html pages.
+"""
+
+from __future__ import annotations
+import time, logging, argparse
+from pathlib import Path
+from bs4 import BeautifulSoup as BS
+from paths import PAGE_STORE_DB
+from page_store import PageStore
+from crawl_demographics import FIELD_PATTERNS, _EXTRACTOR
+from extract import BACKENDS, resolve_backend
+from logging_conf import configure_logging
+
+log = logging.getLogger("bench")
+
+
+def _legacy_parse(html: str) -> dict[str, str | None]:
+    """The pre-engine path: BS tree in _get(), .text, second BS tree, six DOTALL regexes."""
+    text = BS(BS(html, "html.parser").text, "html.parser").get_text(" ", strip=True)
+    out  = {k: None for k in FIELD_PATTERNS}
+    for k, patt in FIELD_PATTERNS.items():
+        m = patt.search(text)
+        if m:
+            out[k] = m.group(1).replace(",", "")
+    return out
+
+
+def load_corpus(source: Path) -> list[str]:
+    if source.is_dir():
+        return [p.read_text(encoding="utf-8", errors="replace") for p in sorted(source.glob("*.html"))]
+    with PageStore(source) as store:
+        return [page.html for page in store.pages()]
+
+
+def _time(fn, pages: list[str], repeat: int) -> tuple[float, list]:
+    best, out = float("inf"), []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = [fn(html) for html in pages]
+        best = min(best, time.perf_counter() - t0)
+    return len(pages) / best, out
+
+
+def run(source: Path, repeat: int = 3) -> None:
+    pages = load_corpus(source)
+    if not pages:
+        raise SystemExit(f"No pages found in {source}")
+    log.info("Corpus: %d pages from %s", len(pages), source)
+
+    legacy_rate, legacy_out = _time(_legacy_parse, pages, repeat)
+    log.info("%-12s %8.1f pages/sec", "legacy", legacy_rate)
+
+    for backend in BACKENDS[1:]:
+        try:
+            resolve_backend(backend)
+        except ImportError:
+            log.info("%-12s skipped (not installed)", backend)
+            continue
+        rate, out = _time(lambda html: _EXTRACTOR.extract(html, backend), pages, repeat)
+        same = sum(a == b for a, b in zip(out, legacy_out))
+        log.info("%-12s %8.1f pages/sec  x%.1f  (%d/%d records identical to legacy)",
+                 backend, rate, rate / legacy_rate, same, len(pages))
+
+
+if __name__ == "__main__":
+    configure_logging()
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--corpus", type=Path, default=PAGE_STORE_DB,
+                    help="Page store file or directory of saved *.html pages")
+    ap.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    args = ap.parse_args()
+    run(args.corpus, args.repeat)
@@ -0,0 +1,77 @@
+"""
+Peak-memory benchmark for --low-memory: runs clean_* + build_features on the
+same synthetic inputs in the default and the low-memory mode, reports
+tracemalloc peak and wall time per mode, and checks that X stays numerically
+equivalent (exit code 1 if it does not).
+
+    python bench_lowmem.py --rows 1000000
+
+Generated files go to a temporary PIPELINE_OUT_DIR (deleted at exit), never to output/;
+set PIPELINE_OUT_DIR to keep them.
+"""
+
+from __future__ import annotations
+import sys, time, tracemalloc
+import synth
+
+synth.use_temp_out_dir()      # before the pipeline modules import paths.py
+
+import logging, argparse
+import numpy as np
+import io_load, cleaning, feature_engineering as fe
+from paths import OUT_DIR
+from logging_conf import configure_logging
+
+log = logging.getLogger("bench")
+
+
+def _pipeline(gdp, pop, demo, low_memory: bool) -> np.ndarray:
+    demo_c = cleaning.clean_demographics(demo.copy(), low_memory=low_memory)
+    gdp_c = cleaning.clean_gdp(gdp.copy(), dropped_csv=None, low_memory=low_memory)
+    pop_c = cleaning.clean_population(pop.copy(), low_memory=low_memory)
+    X, _ = fe.build_features(demo_c, gdp_c, pop_c, x_path=None, lost_csv=None, low_memory=low_memory)
+    return X
+
+
+def measure(rows: int, seed: int = 0) -> dict:
+    files = synth.write_dataset(OUT_DIR / f"synth_{rows}", rows, seed=seed)
+    gdp, pop = io_load.load_gdp(files["gdp"], previews=False), io_load.load_pop(files["pop"], previews=False)
+    demo = io_load.load_demographics(files["demo"])
+    out = {}
+    logging.disable(logging.WARNING)
+    try:
+        _pipeline(gdp, pop, demo, low_memory=False)      # registers every country once, untimed
+        for mode, low in (("default", False), ("low-memory", True)):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            X = _pipeline(gdp, pop, demo, low_memory=low)
+            wall = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            out[mode] = {"X": X, "wall_s": wall, "peak_mem_bytes": peak}
+    finally:
+        logging.disable(logging.NOTSET)
+    return out
+
+
+if __name__ == "__main__":
+    configure_logging()
+    ap = argparse.ArgumentParser(description="Peak memory: default vs --low-memory cleaning + features")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000], help="Scales to run")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--atol", type=float, default=1e-4, help="Allowed absolute difference in X (z-scores)")
+    args = ap.parse_args()
+
+    failed = False
+    for rows in args.rows:
+        r = measure(rows, args.seed)
+        base, low = r["default"], r["low-memory"]
+        for mode, m in r.items():
+            log.info("%-11s rows=%-9d %8.2f s  peak %9.1f MiB", mode, rows, m["wall_s"], m["peak_mem_bytes"] / 2**20)
+        same_shape = base["X"].shape == low["X"].shape
+        diff = float(np.abs(base["X"] - low["X"]).max()) if same_shape and base["X"].size else 0.0
+        ok = same_shape and diff <= args.atol
+        log.info("rows=%d: peak memory x%.2f, X %s max |diff| = %.2e  %s", rows,
+                 low["peak_mem_bytes"] / base["peak_mem_bytes"], base["X"].shape, diff, "ok" if ok else "MISMATCH")
+        failed |= not ok
+    sys.exit(1 if failed else 0)
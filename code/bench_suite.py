@@ -0,0 +1,163 @@
+"""
+Benchmark suite for the public pipeline functions.
+Generates synthetic inputs (synth.py) at each requested scale, measures best-of-N
+wall time and tracemalloc peak memory per function, and stores / compares
+baselines so slowdowns and memory growth are caught.
+
+    python bench_suite.py --rows 1000 100000 --save-baseline
+    python bench_suite.py --rows 1000 100000 --compare      # exit code 1 on regression
+
+Generated files go to a temporary PIPELINE_OUT_DIR (deleted at exit), never to output/;
+set PIPELINE_OUT_DIR to keep them.
+"""
+
+from __future__ import annotations
+import sys, json, time, platform, tracemalloc
+from pathlib import Path
+import synth
+
+synth.use_temp_out_dir()      # before the pipeline modules import paths.py
+
+import logging, argparse
+import utils, io_load, cleaning, feature_engineering as fe
+from crawl_demographics import _parse_country_page
+from country_registry import get_registry
+from paths import OUT_DIR, BENCH_BASELINE_JSON
+from logging_conf import configure_logging
+
+log = logging.getLogger("bench")
+
+
+# --------------------------------------------------------------------------- #
+#  Cases: name -> (setup(ctx) -> args, function)
+#  setup runs before every repetition and is not timed (cleaners mutate their input)
+# --------------------------------------------------------------------------- #
+
+def _context(rows: int, pages: int, seed: int) -> dict:
+    files = synth.write_dataset(OUT_DIR / f"synth_{rows}", rows, pages=pages, seed=seed)
+    logging.disable(logging.WARNING)    # the functions log per call; keep timings clean
+    try:
+        gdp, pop = io_load.load_gdp(files["gdp"]), io_load.load_pop(files["pop"])
+        demo = io_load.load_demographics(files["demo"])
+        demo_c = cleaning.clean_demographics(demo.copy())
+        gdp_c, pop_c = cleaning.clean_gdp(gdp.copy()), cleaning.clean_population(pop.copy())
+        _, merged = fe.build_features(demo_c.copy(), gdp_c.copy(), pop_c.copy())
+    finally:
+        logging.disable(logging.NOTSET)
+    html = [p.read_text(encoding="utf-8") for p in sorted(files["pages"].glob("*.html"))] if pages else []
+    return {"files": files, "gdp": gdp, "pop": pop, "demo": demo, "demo_c": demo_c,
+            "gdp_c": gdp_c, "pop_c": pop_c, "merged": merged, "html": html}
+
+
+def _parse_pages(pages: list[str]) -> list[dict]:
+    return [_parse_country_page(h) for h in pages]
+
+
+CASES = {
+    "utils.load_df":               (lambda c: (c["files"]["demo"],), utils.load_df),
+    "io_load.load_gdp":            (lambda c: (c["files"]["gdp"],), io_load.load_gdp),
+    "io_load.load_pop":            (lambda c: (c["files"]["pop"],), io_load.load_pop),
+    "io_load.load_demographics":   (lambda c: (c["files"]["demo"],), io_load.load_demographics),
+    "cleaning.clean_demographics": (lambda c: (c["demo"].copy(),), cleaning.clean_demographics),
+    "cleaning.clean_gdp":          (lambda c: (c["gdp"].copy(),), cleaning.clean_gdp),
+    "cleaning.clean_population":   (lambda c: (c["pop"].copy(),), cleaning.clean_population),
+    "cleaning.clean_gdp_stream":   (lambda c: (c["files"]["gdp"],), cleaning.clean_gdp_stream),
+    "cleaning.clean_population_stream": (lambda c: (c["files"]["pop"],), cleaning.clean_population_stream),
+    "registry.ids":                (lambda c: (c["demo"]["Country"],), lambda s: get_registry().ids(s)),
+    "fe.build_features":           (lambda c: (c["demo_c"].copy(), c["gdp_c"].copy(), c["pop_c"].copy()),
+                                    fe.build_features),
+    "fe.build_features_ooc":       (lambda c: (c["demo_c"], c["gdp_c"], c["pop_c"]), fe.build_features_ooc),
+    "utils.stats_for_numeric_fields": (lambda c: (c["merged"].copy(), ["Country"]), utils.stats_for_numeric_fields),
+    "utils.pearson_correlation":   (lambda c: (c["merged"], "LifeExpectancy_Both", "LogPopulation"),
+                                    utils.pearson_correlation),
+    "utils.store_head":            (lambda c: (c["gdp"], 5, OUT_DIR / "bench_head.csv", "Country"), utils.store_head),
+    "crawler.parse_pages":         (lambda c: (c["html"],), _parse_pages),
+}
+
+
+def measure(setup, fn, ctx: dict, repeat: int) -> dict:
+    logging.disable(logging.WARNING)
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            args = setup(ctx)
+            t0 = time.perf_counter()
+            fn(*args)
+            best = min(best, time.perf_counter() - t0)
+        args = setup(ctx)
+        tracemalloc.start()
+        fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        logging.disable(logging.NOTSET)
+    return {"wall_s": best, "peak_mem_bytes": peak}
+
+
+def run(rows_list: list[int], repeat: int, pages: int, seed: int, only: str | None) -> dict:
+    results = {}
+    for rows in rows_list:
+        ctx = _context(rows, pages, seed)
+        for name, (setup, fn) in CASES.items():
+            if only and only not in name:
+                continue
+            if name == "crawler.parse_pages" and not ctx["html"]:
+                continue
+            r = measure(setup, fn, ctx, repeat)
+            results[f"{name}@{rows}"] = r
+            log.info("%-36s rows=%-9d %9.4f s  %10.1f KiB", name, rows, r["wall_s"], r["peak_mem_bytes"] / 1024)
+    return results
+
+
+def compare(results: dict, baseline: dict, time_tol: float, mem_tol: float,
+            noise_s: float = 0.005) -> list[str]:
+    """Names of cases slower / hungrier than baseline beyond the tolerances."""
+    regressions = []
+    for key, now in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        t_ratio = now["wall_s"] / base["wall_s"] if base["wall_s"] else 1.0
+        m_ratio = now["peak_mem_bytes"] / base["peak_mem_bytes"] if base["peak_mem_bytes"] else 1.0
+        slow = t_ratio > 1 + time_tol and now["wall_s"] - base["wall_s"] > noise_s
+        fat = m_ratio > 1 + mem_tol
+        flag = "REGRESSION" if slow or fat else "ok"
+        log.info("%-46s time x%.2f  mem x%.2f  %s", key, t_ratio, m_ratio, flag)
+        if slow or fat:
+            regressions.append(key)
+    return regressions
+
+
+if __name__ == "__main__":
+    configure_logging()
+    ap = argparse.ArgumentParser(description="Timing / memory benchmarks on synthetic data")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000],
+                    help="Scales to run (e.g. 1000 100000 10000000)")
+    ap.add_argument("--repeat", type=int, default=3, help="Timing repetitions, best is kept")
+    ap.add_argument("--pages", type=int, default=50, help="Synthetic HTML pages for the parser case")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--only", help="Run only cases whose name contains this text")
+    ap.add_argument("--baseline", type=Path, default=BENCH_BASELINE_JSON)
+    ap.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    ap.add_argument("--compare", action="store_true", help="Compare against the stored baseline")
+    ap.add_argument("--time-tol", type=float, default=0.25, help="Allowed relative slowdown (default 25%%)")
+    ap.add_argument("--mem-tol", type=float, default=0.10, help="Allowed relative memory growth (default 10%%)")
+    args = ap.parse_args()
+
+    results = run(args.rows, args.repeat, args.pages, args.seed, args.only)
+
+    if args.compare:
+        if not args.baseline.exists():
+            sys.exit(f"No baseline at {args.baseline}; run with --save-baseline first")
+        stored = json.loads(args.baseline.read_text())
+        bad = compare(results, stored["results"], args.time_tol, args.mem_tol)
+        if bad:
+            log.error("%d regression(s): %s", len(bad), ", ".join(bad))
+            sys.exit(1)
+    if args.save_baseline:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+        stored["results"].update(results)
+        stored.update(python=platform.python_version(), machine=platform.platform(),
+                      saved=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True))
+        log.info("Saved baseline for %d cases to %s", len(results), args.baseline)
@@ -0,0 +1,240 @@
+"""
+Checks the fetcher and the crawler's retry rounds against local stand-in
+servers (http.server on 127.0.0.1, no network access):
+per-host rate limiting, every result delivered once and in order (concurrency 1),
+at most `concurrency` requests in flight, failures yielded instead of raised,
+and failed pages re-fetched in retry rounds after the backoff delay.
+Exit code 1 if a check fails.
+
+    python check_fetcher.py --pages 12 --rate 20
+
+The crawl's files go to a temporary PIPELINE_OUT_DIR (deleted at exit), never to output/.
+"""
+
+from __future__ import annotations
+import sys, time, threading
+import synth
+
+synth.use_temp_out_dir()      # before the pipeline modules import paths.py
+
+import logging, argparse
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from paths import OUT_DIR
+from fetcher import Fetcher
+from logging_conf import configure_logging
+
+log = logging.getLogger("check")
+
+PAGE_DELAY = 0.02       # seconds the server takes per /page/<n>, so concurrent requests overlap
+
+
+class StandIn:
+    """
+    A local site in a background thread.  Serves /page/<n> (body "<n>"), a
+    Worldometer-like /demographics/ index with one synthetic page per country,
+    and answers 503 to a country page `fail[slug]` times before serving it.
+    Every request is logged as (path, arrival time).
+    """
+
+    def __init__(self, countries: dict[str, dict] | None = None, fail: dict[str, int] | None = None):
+        self.countries = {_slug(c): (c, rec) for c, rec in (countries or {}).items()}
+        self.fail = dict(fail or {})
+        self.hits: list[tuple[str, float]] = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site._lock:
+                    site.hits.append((self.path, time.monotonic()))
+                    site.active += 1
+                    site.peak = max(site.peak, site.active)
+                try:
+                    status, body = site.respond(self.path)
+                finally:
+                    with site._lock:
+                        site.active -= 1
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, path: str) -> tuple[int, str]:
+        if path.startswith("/page/"):
+            time.sleep(PAGE_DELAY)
+            return 200, path.rsplit("/", 1)[1]
+        if path == "/demographics/":
+            links = "".join(f'<li><a href="/demographics/{s}-demographics/">{c}</a></li>'
+                            for s, (c, _) in self.countries.items())
+            return 200, f"<html><body><h2>Demographics of Countries</h2><ul>{links}</ul></body></html>"
+        slug = path.strip("/").split("/")[-1].removesuffix("-demographics")
+        if slug in self.countries:
+            with self._lock:
+                if self.fail.get(slug, 0) > 0:
+                    self.fail[slug] -= 1
+                    return 503, "try again"
+            name, rec = self.countries[slug]
+            return 200, synth.country_page(name, rec, padding=10)
+        return 404, "not found"
+
+    def times(self, prefix: str = "") -> np.ndarray:
+        with self._lock:
+            return np.array(sorted(t for p, t in self.hits if p.startswith(prefix)))
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _slug(name: str) -> str:
+    return name.lower().replace(" ", "-")
+
+
+# --------------------------------------------------------------------------- #
+#  Checks: each returns a list of failure messages (empty = passed)
+# --------------------------------------------------------------------------- #
+
+def check_rate(pages: int, rate: float, concurrency: int) -> list[str]:
+    """One host: request arrivals are spaced by the token bucket however many threads fetch."""
+    site = StandIn()
+    try:
+        with Fetcher(concurrency=concurrency, rate=rate) as f:
+            list(f.fetch_all({i: f"{site.url}/page/{i}" for i in range(pages)}))
+        t = site.times("/page/")
+    finally:
+        site.close()
+    span, floor = t[-1] - t[0], (pages - 1) / rate
+    log.info("rate: %d requests over %.2fs (floor %.2fs), closest gap %.3fs (1/rate %.3fs)",
+             len(t), span, floor, np.diff(t).min(), 1 / rate)
+    problems = []
+    if span < 0.9 * floor:
+        problems.append(f"{pages} requests in {span:.2f}s, expected >= {floor:.2f}s at {rate}/s")
+    if np.diff(t).min() < 0.5 / rate:
+        problems.append(f"two requests {np.diff(t).min():.3f}s apart at {rate}/s")
+    return problems
+
+
+def check_per_host(pages: int, rate: float, concurrency: int) -> list[str]:
+    """Two hosts: each is limited on its own, so together they take as long as one, not two."""
+    a, b = StandIn(), StandIn()
+    try:
+        urls = {}
+        for i in range(pages):
+            urls[f"a{i}"], urls[f"b{i}"] = f"{a.url}/page/{i}", f"{b.url}/page/{i}"
+        t0 = time.perf_counter()
+        with Fetcher(concurrency=concurrency, rate=rate) as f:
+            list(f.fetch_all(urls))
+        wall = time.perf_counter() - t0
+        spans = [s.times("/page/")[-1] - s.times("/page/")[0] for s in (a, b)]
+    finally:
+        a.close()
+        b.close()
+    floor = (pages - 1) / rate
+    log.info("per-host: 2 x %d requests in %.2fs; per host %.2fs / %.2fs (floor %.2fs each)",
+             pages, wall, *spans, floor)
+    problems = [f"host {h}: {pages} requests in {s:.2f}s, expected >= {floor:.2f}s"
+                for h, s in zip("ab", spans) if s < 0.9 * floor]
+    if wall > 1.5 * floor:
+        problems.append(f"two hosts took {wall:.2f}s, as if they shared one limit ({2 * floor:.2f}s)")
+    return problems
+
+
+def check_results(pages: int, rate: float, concurrency: int) -> list[str]:
+    """
+    Every key once with its own page; input order at concurrency 1; failures yielded, not raised.
+    Runs with the limit lifted (`rate` x 100) so that `concurrency` requests really overlap.
+    """
+    rate *= 100
+    site = StandIn()
+    problems = []
+    try:
+        urls = {i: f"{site.url}/page/{i}" for i in range(pages)}
+        urls["missing"] = f"{site.url}/nowhere"
+        for conc in (1, concurrency):
+            with Fetcher(concurrency=conc, rate=rate) as f:
+                got = list(f.fetch_all(urls))
+            keys = [k for k, _ in got]
+            if sorted(keys, key=str) != sorted(urls, key=str):
+                problems.append(f"concurrency {conc}: keys {keys} != {list(urls)}")
+            if conc == 1 and keys != list(urls):
+                problems.append(f"concurrency 1: yielded out of order: {keys}")
+            for k, res in got:
+                if k == "missing":
+                    if not isinstance(res, Exception):
+                        problems.append(f"concurrency {conc}: 404 yielded as {res!r}, not an exception")
+                elif isinstance(res, Exception) or res.text != str(k):
+                    problems.append(f"concurrency {conc}: key {k} got {res!r}")
+        if concurrency > 1 and site.peak < 2:
+            problems.append(f"requests never overlapped with concurrency {concurrency}")
+        if site.peak > concurrency:
+            problems.append(f"{site.peak} requests in flight with concurrency {concurrency}")
+    finally:
+        site.close()
+    log.info("results: %d keys at concurrency 1 and %d, at most %d in flight",
+             len(urls), concurrency, site.peak)
+    return problems
+
+
+def check_retries(pages: int, rate: float, concurrency: int, backoff: float) -> list[str]:
+    """The crawler re-fetches failed pages in later rounds, waiting `backoff` (doubling) before each."""
+    from crawl_demographics import crawl_demographics
+    demo = synth.make_tables(pages, seed=0)["demo"].drop_duplicates("Country").head(pages)
+    countries = {r["Country"]: r for r in demo.to_dict("records")}
+    once, twice = (_slug(c) for c in list(countries)[:2])
+    site = StandIn(countries, fail={once: 1, twice: 2})
+    try:
+        df = crawl_demographics(concurrency=concurrency, rate=rate, base=site.url, use_store=False,
+                                retries=2, backoff=backoff, journal_path=OUT_DIR / "check_journal.jsonl")
+        attempts = {s: site.times(f"/demographics/{s}-") for s in (once, twice)}
+    finally:
+        site.close()
+    problems = []
+    if sorted(df["Country"]) != sorted(countries):
+        problems.append(f"crawled {len(df)} of {len(countries)} countries")
+    for slug, n in ((once, 2), (twice, 3)):
+        if len(attempts[slug]) != n:
+            problems.append(f"{slug}: fetched {len(attempts[slug])} times, expected {n}")
+    gaps = np.diff(attempts[twice])
+    for i, gap in enumerate(gaps):
+        if gap < backoff * 2 ** i:
+            problems.append(f"retry round {i + 1} started after {gap:.2f}s, expected >= {backoff * 2 ** i:.2f}s")
+    log.info("retries: %d countries crawled, %s re-fetched after %s s", len(df), twice,
+             " / ".join(f"{g:.2f}" for g in gaps))
+    return problems
+
+
+if __name__ == "__main__":
+    configure_logging()
+    ap = argparse.ArgumentParser(description="Fetcher checks against a local stand-in server")
+    ap.add_argument("--pages", type=int, default=12, help="Requests per check (per host)")
+    ap.add_argument("--rate", type=float, default=20.0, help="Requests/sec per host")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--backoff", type=float, default=0.2, help="Crawler backoff before the first retry round")
+    args = ap.parse_args()
+
+    failed = False
+    for name, check in (("rate", check_rate), ("per-host", check_per_host), ("results", check_results)):
+        problems = check(args.pages, args.rate, args.concurrency)
+        for p in problems:
+            log.error("%s: %s", name, p)
+        failed |= bool(problems)
+    problems = check_retries(args.pages, args.rate, args.concurrency, args.backoff)
+    for p in problems:
+        log.error("retries: %s", p)
+    failed |= bool(problems)
+    log.info("all checks passed" if not failed else "FAILED")
+    sys.exit(1 if failed else 0)
@@ -1,17 +1,22 @@
 """
 Rigorous cleaning steps (Q4) for demographics, GDP, population.
 Outputs name_mismatches.csv, dropped_gdp.csv, etc.
+low_memory=True keeps the same rows but builds the cleaned frame in a single
+gather with a categorical Country and float32 / downcast numerics.
 """
 
 from __future__ import annotations
 import re, logging, pandas as pd, numpy as np
 from utils import *
-from paths import (NAME_MISMATCHES_CSV, DROPPED_GDP_CSV,
+from country_registry import get_registry
+from sketch import QuantileSketch
+from report_sink import get_sink
+from io_load import read_gdp_chunks, read_pop_chunks
+from paths import (ensure_dirs, NAME_MISMATCHES_CSV, DROPPED_GDP_CSV,
                     DEMOGRAPHICS_RAW_CSV,
                     GDP_PER_CAPITA_2021, POPULATION_2021)
 from logging_conf import configure_logging
 
-configure_logging()
 log = logging.getLogger("clean")
 
 # --------------------------------------------------------------------------- #
@@ -19,32 +24,72 @@ log = logging.getLogger("clean")
 # --------------------------------------------------------------------------- #
 
 def _standardize_country(col: pd.Series, store_mismatches=False) -> tuple[pd.Series, pd.DataFrame]:
-    orig = col.copy()
-    new  = (orig.str.strip()
-                .str.replace(r"^the\s+", "", regex=True, flags=re.IGNORECASE)
-                .str.title())
-    mism = pd.DataFrame({"Original": orig, "Standardized": new})
-    mism = mism[mism["Original"] != mism["Standardized"]]
+    new  = (col.str.strip()
+               .str.replace(r"^the\s+", "", regex=True, flags=re.IGNORECASE)
+               .str.title())
+    changed = (col != new).to_numpy()      # only the corrected rows make it into `mism`
+    mism = pd.DataFrame({"Original": col[changed], "Standardized": new[changed]})
     if not mism.empty and store_mismatches:
-        mism.to_csv(NAME_MISMATCHES_CSV, index=False)
+        get_sink().to_csv(mism, NAME_MISMATCHES_CSV, index=False)
         log.info("Saved %s with %d corrected names", NAME_MISMATCHES_CSV.name, len(mism))
     return new, mism
 
+def _key_by_id(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace the Country names by registry IDs: int 'CountryID' column + categorical names."""
+    reg = get_registry()
+    ids = reg.ids(df["Country"])
+    return df.assign(CountryID=ids, Country=pd.Categorical(reg.names(ids)))
+
+def _compact(values: np.ndarray) -> np.ndarray:
+    """Low-memory dtype: float32 for floats, smallest integer type for ints."""
+    if values.dtype.kind == "f":
+        return values.astype("float32", copy=False)
+    if values.dtype.kind in "iu":
+        return pd.to_numeric(pd.Series(values), downcast="integer").to_numpy()
+    return values
+
+def _key_by_id_compact(df: pd.DataFrame, country: pd.Series, keep: np.ndarray,
+                       dedupe: bool = True) -> pd.DataFrame:
+    """
+    Low-memory filter + _key_by_id (+ drop_duplicates on CountryID) in one step:
+    IDs are resolved for the kept rows only and every column is gathered once,
+    downcast, straight into the final CountryID-indexed frame.
+    """
+    reg = get_registry()
+    rows = np.flatnonzero(keep)
+    ids = reg.ids(country.iloc[rows])
+    if dedupe:
+        first = ~pd.Index(ids).duplicated()
+        rows, ids = rows[first], ids[first]
+    cols = {c: pd.Categorical(reg.names(ids)) if c == "Country" else _compact(df[c].to_numpy()[rows])
+            for c in df.columns}
+    return pd.DataFrame(cols, index=pd.Index(ids, name="CountryID"))
+
 def _tukey_outliers(s: pd.Series) -> pd.Series:
     q1, q3 = s.quantile([0.25, 0.75])
     iqr    = q3 - q1
     lower, upper = q1 - 1.5*iqr, q3 + 1.5*iqr
     return (s < lower) | (s > upper)
 
+def _sketch_outliers(sk: QuantileSketch) -> int:
+    """Tukey outlier count from a quantile sketch (approximate, no second pass)."""
+    q1, q3 = sk.quantile([0.25, 0.75])
+    iqr    = q3 - q1
+    lower, upper = q1 - 1.5*iqr, q3 + 1.5*iqr
+    return sk.rank(lower) + sk.count - sk.rank(upper, strict=False)
+
 # --------------------------------------------------------------------------- #
 #  Dataset-specific cleaners
 # --------------------------------------------------------------------------- #
 
-def clean_demographics(df: pd.DataFrame) -> pd.DataFrame:
+def clean_demographics(df: pd.DataFrame, low_memory: bool = False) -> pd.DataFrame:
     log.info("Cleaning demographics dataset...")
 
     numeric_cols = [c for c in df.columns if c != "Country"]
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
+    # io_load.load_demographics parses these natively; only text columns still need coercing
+    text_cols = [c for c in numeric_cols if not pd.api.types.is_numeric_dtype(df[c])]
+    if text_cols:
+        df[text_cols] = df[text_cols].apply(pd.to_numeric, errors="coerce")
 
     # Log non-numeric conversion issues
     non_numeric_counts = df[numeric_cols].isna().sum()
@@ -52,70 +97,133 @@ def clean_demographics(df: pd.DataFrame) -> pd.DataFrame:
         if cnt > 0:
             log.info("Non-numeric values in %s: %d", col, cnt)
 
-    df["Country"], mismatches = _standardize_country(df["Country"], store_mismatches=True)
+    country, mismatches = _standardize_country(df["Country"], store_mismatches=True)
     if not mismatches.empty:
         log.info("Country name mismatches corrected: %d", len(mismatches))
 
-
     before = len(df)
-    df = df[df["LifeExpectancy_Both"].between(40, 100)]
+    valid = df["LifeExpectancy_Both"].between(40, 100)
+    if low_memory:
+        df = _key_by_id_compact(df, country, valid.to_numpy(), dedupe=False)
+    else:
+        df["Country"] = country
+        df = _key_by_id(df[valid]).set_index("CountryID", drop=True)
     after = len(df)
     log.info("Dropped %d rows with invalid LifeExpectancy (kept %d of %d)", before-after, after, before)
-
-    df = df.set_index("Country", drop=True)
     return df
 
 
-def clean_gdp(df: pd.DataFrame) -> pd.DataFrame:
+def clean_gdp(df: pd.DataFrame, dropped_csv: Path | None = DROPPED_GDP_CSV,
+              low_memory: bool = False) -> pd.DataFrame:
     log.info("Cleaning GDP dataset...")
 
-    df["Country"], mismatches = _standardize_country(df["Country"])
+    country, mismatches = _standardize_country(df["Country"])
     if not mismatches.empty:
         log.info("Country name mismatches corrected in GDP: %d", len(mismatches))
 
     total_before = len(df)
-    missing = df["GDP_per_capita_PPP"].isna().sum()
-    log.info("Missing GDP per capita entries: %d", missing)
     mask_missing = df["GDP_per_capita_PPP"].isna()
-    df.loc[mask_missing].to_csv(DROPPED_GDP_CSV, index=False)
-    df = df[~mask_missing]
+    missing = mask_missing.sum()
+    log.info("Missing GDP per capita entries: %d", missing)
+    if dropped_csv is not None:
+        get_sink().to_csv(df.loc[mask_missing].assign(Country=country[mask_missing]), dropped_csv, index=False)
 
-    outliers = _tukey_outliers(df["GDP_per_capita_PPP"])
+    outliers = _tukey_outliers(df["GDP_per_capita_PPP"][~mask_missing])
     log.info("GDP outliers detected (Tukey): %d (not dropped)", outliers.sum())
 
-    df = df.drop_duplicates(subset="Country")
+    if low_memory:
+        df = _key_by_id_compact(df, country, ~mask_missing.to_numpy())
+    else:
+        df["Country"] = country
+        df = _key_by_id(df[~mask_missing]).drop_duplicates(subset="CountryID").set_index("CountryID")
     total_after = len(df)
     log.info("Dropped %d duplicate rows based on country (final count: %d)", total_before - total_after - missing, total_after)
-
-    df = df.set_index("Country")
     return df
 
 
-def clean_population(df: pd.DataFrame) -> pd.DataFrame:
+def clean_population(df: pd.DataFrame, low_memory: bool = False) -> pd.DataFrame:
     log.info("Cleaning population dataset...")
 
-    df["Country"], mismatches = _standardize_country(df["Country"])
+    country, mismatches = _standardize_country(df["Country"])
     if not mismatches.empty:
         log.info("Country name mismatches corrected in population: %d", len(mismatches))
 
     total_before = len(df)
-    missing_pop = df["Population"].isna().sum()
+    mask_missing = df["Population"].isna()
+    missing_pop = mask_missing.sum()
     log.info("Missing population values: %d", missing_pop)
-    df = df[~df["Population"].isna()]
 
-    df["LogPop"] = np.log10(df["Population"])
-    out = _tukey_outliers(df["LogPop"])
+    out = _tukey_outliers(np.log10(df["Population"][~mask_missing]))
     log.info("Population outliers detected: %d (not dropped)", out.sum())
 
-    df = df.drop(columns="LogPop").drop_duplicates(subset="Country")
+    if low_memory:
+        df = _key_by_id_compact(df, country, ~mask_missing.to_numpy())
+    else:
+        df["Country"] = country
+        df = _key_by_id(df[~mask_missing]).drop_duplicates(subset="CountryID").set_index("CountryID")
     total_after = len(df)
     log.info("Dropped %d duplicate countries (final count: %d)", total_before - total_after - missing_pop, total_after)
-
-    df = df.set_index("Country")
     return df
 
 
+# --------------------------------------------------------------------------- #
+#  Streaming cleaners: same rules, chunk by chunk, memory independent of file size
+# --------------------------------------------------------------------------- #
+
+def _clean_stream(chunks, value_col: str, name: str, outlier_transform=None,
+                  dropped_csv: Path | None = None) -> pd.DataFrame:
+    sketch, seen, kept = QuantileSketch(), set(), []
+    total_before = missing = corrected = 0
+    for i, chunk in enumerate(chunks):
+        chunk["Country"], mismatches = _standardize_country(chunk["Country"])
+        corrected += len(mismatches)
+        total_before += len(chunk)
+
+        mask_missing = chunk[value_col].isna()
+        missing += int(mask_missing.sum())
+        if dropped_csv is not None:
+            get_sink().to_csv(chunk.loc[mask_missing], dropped_csv, index=False,
+                              mode="w" if i == 0 else "a", header=i == 0)
+        chunk = chunk[~mask_missing]
+
+        vals = chunk[value_col]
+        sketch.update(outlier_transform(vals) if outlier_transform else vals)
+
+        chunk = _key_by_id(chunk).drop_duplicates(subset="CountryID")
+        chunk = chunk[~chunk["CountryID"].isin(seen)]
+        seen.update(chunk["CountryID"].tolist())
+        kept.append(chunk)
+
+    if corrected:
+        log.info("Country name mismatches corrected in %s: %d", name, corrected)
+    log.info("Missing %s values: %d", name, missing)
+    log.info("%s outliers detected (Tukey, sketch): %d (not dropped)", name, _sketch_outliers(sketch))
+
+    df = pd.concat(kept) if kept else pd.DataFrame(columns=["Country", value_col, "CountryID"])
+    df["Country"] = pd.Categorical(get_registry().names(df["CountryID"]))
+    total_after = len(df)
+    log.info("Dropped %d duplicate rows based on country (final count: %d)",
+             total_before - total_after - missing, total_after)
+    return df.set_index("CountryID")
+
+
+def clean_gdp_stream(path: Path, chunksize: int = 100_000) -> pd.DataFrame:
+    """clean_gdp(load_gdp(path)) without holding the raw table in memory."""
+    log.info("Cleaning GDP dataset in chunks of %d rows...", chunksize)
+    return _clean_stream(read_gdp_chunks(path, chunksize), "GDP_per_capita_PPP", "GDP",
+                         dropped_csv=DROPPED_GDP_CSV)
+
+
+def clean_population_stream(path: Path, chunksize: int = 100_000) -> pd.DataFrame:
+    """clean_population(load_pop(path)) without holding the raw table in memory."""
+    log.info("Cleaning population dataset in chunks of %d rows...", chunksize)
+    return _clean_stream(read_pop_chunks(path, chunksize), "Population", "population",
+                         outlier_transform=np.log10)
+
+
 if __name__ == "__main__":
+    configure_logging()
+    ensure_dirs()
     demographics_df = load_df(DEMOGRAPHICS_RAW_CSV)
     clean_demographics(demographics_df)
 
@@ -0,0 +1,153 @@
+"""
+Persistent country identity registry.
+Maps raw country names and known aliases to stable integer IDs, so the
+datasets are joined on integers and spelling variants ("Cote D'Ivoire" /
+"Côte d'Ivoire", "Cape Verde" / "Cabo Verde") land on the same country.
+IDs are kept in country_registry.csv and reused across runs.
+A country's display name is the preferred spelling among all seen (see
+_display_rank), not the first one, so names - and the name-sorted rows of
+X / merged - do not depend on which dataset or pipeline stage came first.
+"""
+
+from __future__ import annotations
+import re, logging, threading, unicodedata
+import numpy as np, pandas as pd
+from pathlib import Path
+from paths import COUNTRY_REGISTRY_CSV
+
+log = logging.getLogger("registry")
+
+UNKNOWN_ID = -1      # missing / empty country name
+
+# alias key -> canonical key (both already normalized, see normalize_name)
+ALIASES = {
+    "cape verde":                       "cabo verde",
+    "czech republic":                   "czechia",
+    "czech republic (czechia)":         "czechia",
+    "dr congo":                         "democratic republic of congo",
+    "east timor":                       "timor-leste",
+    "faeroe islands":                   "faroe islands",
+    "micronesia (country)":             "micronesia",
+    "state of palestine":               "palestine",
+    "saint vincent and the grenadines": "saint vincent and grenadines",
+    "u.s. virgin islands":              "united states virgin islands",
+}
+
+
+def _fold(name: str) -> str:
+    """normalize_name before alias resolution."""
+    s = unicodedata.normalize("NFKD", name)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.replace("’", "'").replace("&", " and ").casefold()
+    s = re.sub(r"\bst\.\s*", "saint ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return re.sub(r"^the\s+", "", s)
+
+
+def normalize_name(name: str) -> str:
+    """Spelling-insensitive key: no accents/case/'the'/'&'/'St.' differences."""
+    s = _fold(name)
+    return ALIASES.get(s, s)
+
+
+def _display_rank(name: str, key: str) -> tuple[bool, str]:
+    """Lower is preferred: non-alias spellings first, then the smallest string."""
+    return _fold(name) != key, name
+
+
+class CountryRegistry:
+    def __init__(self, path: Path = COUNTRY_REGISTRY_CSV):
+        self.path = path
+        self._ids: dict[str, int] = {}      # canonical key -> id
+        self._names: list[str] = []         # id -> display name (preferred spelling seen)
+        self._memo: dict[str, int] = {}     # raw name -> id
+        self._dirty = False
+        self.frozen = False                 # no new IDs (worker processes share the parent's table)
+        self._lock = threading.RLock()      # cleaners may run on concurrent pipeline stages
+        if path.exists():
+            reg = pd.read_csv(path, keep_default_na=False)
+            self._ids = dict(zip(reg["Key"], reg["CountryID"]))
+            self._names = reg.sort_values("CountryID")["Country"].tolist()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]          # locks cannot be pickled (spawn / forkserver pool workers)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def resolve(self, raw) -> int:
+        """ID for one raw name, registering a new country if needed (memoized)."""
+        cid = self._memo.get(raw)
+        if cid is not None:
+            return cid
+        if not isinstance(raw, str) or not raw.strip():
+            return UNKNOWN_ID
+        key = normalize_name(raw)
+        name = raw.strip()
+        with self._lock:
+            cid = self._ids.get(key)
+            if cid is None:
+                if self.frozen:
+                    raise KeyError(f"{raw!r} is not in the (frozen) country registry")
+                cid = self._ids[key] = len(self._names)
+                self._names.append(name)
+                self._dirty = True
+            elif not self.frozen and _display_rank(name, key) < _display_rank(self._names[cid], key):
+                self._names[cid] = name
+                self._dirty = True
+        self._memo[raw] = cid
+        return cid
+
+    def lookup(self, raw) -> int | None:
+        """ID of an already registered country (None if unknown); never registers."""
+        if not isinstance(raw, str) or not raw.strip():
+            return None
+        return self._ids.get(normalize_name(raw))
+
+    def ids(self, names: pd.Series) -> np.ndarray:
+        """Vectorized resolve: each distinct spelling is looked up only once."""
+        codes, uniques = pd.factorize(names)
+        lookup = np.fromiter((self.resolve(u) for u in uniques), dtype=np.int64, count=len(uniques))
+        out = np.where(codes >= 0, lookup[codes] if len(lookup) else UNKNOWN_ID, UNKNOWN_ID)
+        with self._lock:
+            if self._dirty:
+                self.save()
+        return out
+
+    def names(self, ids) -> pd.Index:
+        """Display names for an array of IDs (NaN for UNKNOWN_ID)."""
+        table = np.array(self._names + [np.nan], dtype=object)     # index -1 -> NaN
+        return pd.Index(table[np.asarray(ids, dtype=np.int64)], name="Country")
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        keys = [None] * len(self._names)
+        for key, cid in self._ids.items():
+            keys[cid] = key
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame({"CountryID": range(len(self._names)), "Key": keys,
+                      "Country": self._names}).to_csv(self.path, index=False)
+        self._dirty = False
+        log.debug("Saved %s (%d countries)", self.path.name, len(self._names))
+
+
+_REGISTRY: CountryRegistry | None = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry() -> CountryRegistry:
+    """Process-wide registry, loaded on first use."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = CountryRegistry()
+    return _REGISTRY
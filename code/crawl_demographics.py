@@ -5,32 +5,36 @@ Logs stats and Pearson correlation for the crawled data.
 """
 
 from __future__ import annotations
-import re, time, logging, requests
+import re, time, hashlib, logging
 from bs4 import Tag, BeautifulSoup as BS
 import pandas as pd
 from pathlib import Path
-from paths import (DEMOGRAPHICS_RAW_CSV,
+from paths import (ensure_dirs, DEMOGRAPHICS_RAW_CSV, PAGE_STORE_DB, DEMOGRAPHICS_JOURNAL,
                     DEMOGRAPHICS_BEFORE_SORT_CSV,
                     DEMOGRAPHICS_AFTER_SORT_CSV)
 from utils import *
+from fetcher import Fetcher, DEFAULT_RATE
+from page_store import PageStore
+from extract import Extractor, BACKENDS, ENGINE_VERSION
+from parse_pool import ParsePool
+from journal import RecordJournal
 from logging_conf import configure_logging
 
-configure_logging()
 log = logging.getLogger("crawler")
 
 BASE = "https://www.worldometers.info"
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0       # seconds before the first retry round, doubled each round
+MAX_BACKOFF = 60.0
 
 
-def _get(url: str, sleep=0.8, **kwargs) -> BS:
-    """HTTP GET with polite delay; returns BeautifulSoup tree."""
-    log.debug("GET %s", url)
-    time.sleep(sleep)
-    r = requests.get(url, timeout=15, **kwargs)
-    r.raise_for_status()
+def _get(url: str, fetcher: Fetcher, **kwargs) -> BS:
+    """Rate-limited HTTP GET through the shared fetcher; returns BeautifulSoup tree."""
+    r = fetcher.get(url, **kwargs)
     return BS(r.text, "html.parser")
 
 
-def _extract_country_links(soup: BS) -> dict[str, str]:
+def _extract_country_links(soup: BS, base: str = BASE) -> dict[str, str]:
     """
     Return {country: absolute_href} for every anchor that appears in the
     section headed 'Demographics of Countries'.
@@ -54,7 +58,7 @@ def _extract_country_links(soup: BS) -> dict[str, str]:
             text = a.get_text(strip=True)
             # only country pages:  /demographics/<something>-demographics/
             if "/demographics/" in href and href.endswith("-demographics/"):
-                links[text] = href if href.startswith("http") else BASE + href
+                links[text] = href if href.startswith("http") else base + href
 
     if not links:
         raise RuntimeError("No country links detected - page structure may have changed")
@@ -82,48 +86,175 @@ FIELD_PATTERNS = {
         re.compile(r"Population\s+Density.*?is\s*([\d\.]+)\s*people", FLAGS),
 }
 
+# stored records are reused only while the extraction rules are unchanged
+PARSER_VERSION = hashlib.sha1(
+    "\n".join([f"engine={ENGINE_VERSION}"] +
+              [f"{k}={p.pattern}" for k, p in FIELD_PATTERNS.items()]).encode()).hexdigest()[:12]
 
-def _parse_country_page(html: str) -> dict[str, str | None]:
+_EXTRACTOR = Extractor(FIELD_PATTERNS)
+
+
+def _parse_country_page(html: str, backend: str = "auto") -> dict[str, str | None]:
     """
     Extract the six required numbers from raw HTML **robustly**:
-    * join all visible text with spaces so regex can span tags/line-breaks
-    * apply the updated FIELD_PATTERNS above
+    * tokenize the page once, joining all visible text with spaces so regex
+      can span tags/line-breaks (`backend` picks the tokenizer, see extract.py)
+    * apply the updated FIELD_PATTERNS above in one forward sweep
     """
-    text = BS(html, "html.parser").get_text(" ", strip=True)
-    out  = {k: None for k in FIELD_PATTERNS}
-    for k, patt in FIELD_PATTERNS.items():
-        m = patt.search(text)
-        if m:
-            out[k] = m.group(1).replace(",", "")
+    return _EXTRACTOR.extract(html, backend=backend)
+
+
+def _parse_raw(body: bytes, encoding: str, backend: str = "auto") -> dict[str, str | None]:
+    """Parse-pool entry point: decode raw page bytes in the worker, then parse."""
+    return _parse_country_page(body.decode(encoding, errors="replace"), backend)
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Numeric dtypes for the columnar copy, matching what read_csv would infer."""
+    out = df.copy()
+    for col in FIELD_PATTERNS:
+        if col in out:
+            try:
+                num = pd.to_numeric(out[col])     # nullable Int64/Float64 from "string"
+            except (ValueError, TypeError):
+                continue      # keep as string; clean_demographics reports it
+            out[col] = num.astype("float64" if num.isna().any() else num.dtype.numpy_dtype)
     return out
 
 
-def crawl_demographics() -> pd.DataFrame:
-    home = _get(f"{BASE}/demographics/")
-    countries = _extract_country_links(home)
-    records = []
-    for c, href in countries.items():
-        try:
-            page = _get(href, sleep=0.3)
-            rec = _parse_country_page(page.text)
-            rec["Country"] = c
-            records.append(rec)
-        except Exception as e:
-            log.warning("Failed %s : %s", c, e)
+def _save_records(records: list[dict]) -> pd.DataFrame:
     df = pd.DataFrame.from_records(records).astype("string")
-    df.to_csv(DEMOGRAPHICS_RAW_CSV, index=False)
+    save_table(_typed(df), DEMOGRAPHICS_RAW_CSV)
     log.info("Saved %s", DEMOGRAPHICS_RAW_CSV.name)
 
     # 10-row previews
     store_head(df, head=10, path=DEMOGRAPHICS_BEFORE_SORT_CSV)
     store_head(df, head=10, path=DEMOGRAPHICS_AFTER_SORT_CSV, sorted="Country")
-
     return df
 
 
-def reload_crawled_data(path: Path) -> pd.DataFrame:
+def _record_from_store(store: PageStore, url: str, backend: str = "auto") -> dict[str, str | None]:
+    """Record for an unchanged page: reuse the stored parse unless FIELD_PATTERNS changed."""
+    page = store.get(url)
+    if page.record is not None and page.parser_version == PARSER_VERSION:
+        return dict(page.record)
+    rec = _parse_country_page(page.html, backend)
+    store.set_record(url, rec, PARSER_VERSION)
+    return rec
+
+
+def crawl_demographics(concurrency: int = 1, rate: float = DEFAULT_RATE,
+                       base: str = BASE, use_store: bool = True,
+                       parser: str = "auto", parse_workers: int = 0,
+                       queue_depth: int | None = None, resume: bool = False,
+                       retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                       journal_path: Path = DEMOGRAPHICS_JOURNAL) -> pd.DataFrame:
+    """
+    Crawl every country page under `base`/demographics/.
+    `concurrency` pages are fetched in parallel over one keep-alive session,
+    while `rate` caps requests/sec per host.
+    With `use_store`, pages already in the page store are revalidated with
+    conditional GETs; a 304 skips both the download and the parse.
+    `parser` selects the HTML tokenizer backend (see extract.BACKENDS).
+    `parse_workers` > 0 moves parsing to a process pool fed through a queue of
+    at most `queue_depth` raw pages (-1 = one worker per CPU, 0 = parse inline).
+    Each record is appended to `journal_path` as soon as it is parsed; with
+    `resume`, countries already journaled are skipped.  Failed pages are
+    retried up to `retries` more rounds, waiting `backoff` seconds (doubling)
+    before each round.  demographics_data.csv is compacted from the journal.
+    """
+    store = PageStore(PAGE_STORE_DB) if use_store else None
+    journal = RecordJournal(journal_path, key="Country", resume=resume)
+    unchanged = 0
+    failed: dict[str, str] = {}
+
+    def fail(c: str, err) -> None:
+        log.warning("Failed %s : %s", c, err)
+        failed[c] = countries[c]
+
+    def collect(c: str, rec, meta) -> None:
+        if isinstance(rec, Exception):
+            fail(c, rec)
+            return
+        if meta is not None:     # freshly downloaded page -> (re)store it
+            url, body, encoding, res_headers = meta
+            try:
+                store.put(url, body.decode(encoding, errors="replace"),
+                          etag=res_headers.get("ETag"), last_modified=res_headers.get("Last-Modified"),
+                          key=c, record=rec, parser_version=PARSER_VERSION)
+            except Exception as e:      # the record is parsed; only the cached copy is lost
+                log.warning("Could not store %s in %s: %s", c, store.path.name, e)
+        rec["Country"] = c
+        journal.append(rec)
+
+    with journal, \
+         Fetcher(concurrency=concurrency, rate=rate) as fetcher, \
+         ParsePool(_parse_raw, workers=parse_workers, depth=queue_depth) as pool:
+        home = _get(f"{base}/demographics/", fetcher)
+        countries = _extract_country_links(home, base=base)
+        todo = {c: url for c, url in countries.items() if c not in journal.done}
+        if resume:
+            log.info("%d of %d countries left to crawl", len(todo), len(countries))
+        for attempt in range(retries + 1):
+            if not todo:
+                break
+            if attempt:
+                delay = min(backoff * 2 ** (attempt - 1), MAX_BACKOFF)
+                log.info("Retry %d/%d: %d page(s) in %.1fs", attempt, retries, len(todo), delay)
+                time.sleep(delay)
+            failed = {}
+            headers = {c: store.conditional_headers(url) for c, url in todo.items()} if store else None
+            for c, res in fetcher.fetch_all(todo, headers=headers):
+                if isinstance(res, Exception):
+                    fail(c, res)
+                    continue
+                url = countries[c]
+                if store is not None and res.status_code == 304:
+                    try:
+                        store.touch(url)
+                        collect(c, _record_from_store(store, url, parser), None)
+                        unchanged += 1
+                    except Exception as e:
+                        fail(c, e)
+                    continue
+                encoding = res.encoding or res.apparent_encoding
+                meta = (url, res.content, encoding, res.headers) if store is not None else None
+                for key, rec, m in pool.submit(c, res.content, encoding, parser, meta=meta):
+                    collect(key, rec, m)
+            for key, rec, m in pool.drain():
+                collect(key, rec, m)
+            todo = failed
+        if todo:
+            log.warning("Giving up on %d page(s) after %d retries: %s", len(todo), retries,
+                        ", ".join(sorted(todo)))
+        # keep the link order so the output does not depend on completion order
+        records = journal.compact(order=list(countries))
+    if store is not None:
+        log.info("%d of %d pages unchanged since last crawl", unchanged, len(countries))
+        store.close()
+    return _save_records(records)
+
+
+def reparse_from_store(path: Path = PAGE_STORE_DB, parser: str = "auto") -> pd.DataFrame:
+    """Rebuild demographics_data.csv from stored pages only - no network access."""
+    if not path.exists():
+        raise FileNotFoundError(f"No page store at {path}; run a crawl first")
+    records = []
+    with PageStore(path) as store:
+        for page in store.pages():
+            try:
+                rec = _record_from_store(store, page.url, parser)
+                rec["Country"] = page.key
+                records.append(rec)
+            except Exception as e:
+                log.warning("Failed %s : %s", page.key, e)
+    log.info("Re-parsed %d pages from %s", len(records), path.name)
+    return _save_records(records)
+
+
+def reload_crawled_data(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
     log.debug(f'Reading already crawled data from {path.name} file')
-    df = pd.read_csv(path, na_values=["None"])
+    df = load_df(path, columns=columns)
 
     return df
 
@@ -136,6 +267,30 @@ def arg_parser():
                     "Logs stats and Pearson correlation for the crawled data.")
     ap.add_argument("--reload", action='store_true',
                     help="Shortens time by reloading already stored data from previous crawling: for stats and corr")
+    ap.add_argument("--concurrency", type=int, default=1, metavar="N",
+                    help="Number of country pages fetched in parallel (default: 1)")
+    ap.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                    help=f"Max requests per second per host (default: {DEFAULT_RATE})")
+    ap.add_argument("--base-url", default=BASE,
+                    help="Site root to crawl, e.g. a local stand-in server for testing")
+    ap.add_argument("--parse-workers", type=int, default=0, metavar="N",
+                    help="Parse pages in N worker processes (-1 = one per CPU, 0 = inline; default: 0)")
+    ap.add_argument("--queue-depth", type=int, default=None, metavar="D",
+                    help="Max raw pages waiting for a parse worker (default: 2 x workers)")
+    ap.add_argument("--parser", choices=BACKENDS, default="auto",
+                    help="HTML tokenizer backend; 'auto' uses lxml when installed")
+    ap.add_argument("--no-store", action="store_true",
+                    help=f"Do not read or update the page store ({PAGE_STORE_DB.name})")
+    ap.add_argument("--resume", action="store_true",
+                    help=f"Continue an interrupted crawl: skip countries already in {DEMOGRAPHICS_JOURNAL.name}")
+    ap.add_argument("--retries", type=int, default=DEFAULT_RETRIES, metavar="N",
+                    help=f"Retry rounds for failed pages, with exponential backoff (default: {DEFAULT_RETRIES})")
+    ap.add_argument("--from-store", action="store_true",
+                    help="Offline: re-parse stored pages with the current FIELD_PATTERNS instead of crawling")
+    ap.add_argument("--table-format", choices=TABLE_FORMATS, default="csv",
+                    help="Storage for demographics_data: csv, or columnar .feather (needs pyarrow)")
+    ap.add_argument("--no-csv-export", action="store_true",
+                    help="With --table-format feather, skip writing the .csv copy")
     ap.add_argument('--metadata', action='store_true',
                     help="Logs columns and shape of the demographics dataframe")
     ap.add_argument('--stats', action='store_true',
@@ -148,12 +303,23 @@ def arg_parser():
 
 
 if __name__ == "__main__":
+    configure_logging()
+    ensure_dirs()
     args = arg_parser()
+    set_table_format(args.table_format, csv_export=not args.no_csv_export)
 
     if args.reload:
-        df = reload_crawled_data(DEMOGRAPHICS_RAW_CSV)
+        # --corr alone only needs two columns
+        only_corr = args.corr and not (args.stats or args.metadata)
+        df = reload_crawled_data(DEMOGRAPHICS_RAW_CSV, columns=[
+            "LifeExpectancy_Both", "PopulationDensity"] if only_corr else None)
+    elif args.from_store:
+        df = reparse_from_store(parser=args.parser)
     else:
-        df = crawl_demographics()
+        df = crawl_demographics(concurrency=args.concurrency, rate=args.rate, base=args.base_url,
+                                use_store=not args.no_store, parser=args.parser,
+                                parse_workers=args.parse_workers, queue_depth=args.queue_depth,
+                                resume=args.resume, retries=args.retries)
 
     if args.metadata:
         log_metadata(name='demographics', df=df)
@@ -0,0 +1,152 @@
+"""
+Single-parse extraction engine for Worldometer country pages.
+Each page is tokenized once into its visible text by a selectable backend,
+then every field is pulled out by chained forward searches compiled from the
+crawler's FIELD_PATTERNS (no leading `.*?`, so no backtracking over the page).
+"""
+
+from __future__ import annotations
+import re, logging
+from functools import lru_cache
+from html.parser import HTMLParser
+
+log = logging.getLogger("extract")
+
+ENGINE_VERSION = "2"     # bump when tokenization changes, invalidates stored records
+BACKENDS = ("auto", "lxml", "html.parser", "bs4")
+_SKIP_TAGS = {"script", "style", "template"}   # same strings BeautifulSoup leaves out of get_text
+
+
+# --------------------------------------------------------------------------- #
+#  Tokenizers: raw HTML -> visible text joined by single spaces
+# --------------------------------------------------------------------------- #
+
+class _TextCollector(HTMLParser):
+    """Streams visible text nodes without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            data = data.strip()
+            if data:
+                self.chunks.append(data)
+
+
+def _text_stdlib(html: str) -> str:
+    p = _TextCollector()
+    p.feed(html)
+    p.close()
+    return " ".join(p.chunks)
+
+
+def _text_lxml(html: str) -> str:
+    import lxml.html
+    root = lxml.html.fromstring(html, parser=lxml.html.HTMLParser(remove_comments=True))
+    for el in root.iter(*_SKIP_TAGS):
+        el.text = None
+        for child in list(el):
+            el.remove(child)
+    return " ".join(t for t in (s.strip() for s in root.itertext()) if t)
+
+
+def _text_bs4(html: str) -> str:
+    from bs4 import BeautifulSoup as BS
+    return BS(html, "html.parser").get_text(" ", strip=True)
+
+
+@lru_cache(maxsize=None)
+def _has_lxml() -> bool:
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """Map 'auto' to the fastest installed backend; validate explicit choices."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}; choose from {BACKENDS}")
+    if backend == "auto":
+        return "lxml" if _has_lxml() else "html.parser"
+    if backend == "lxml" and not _has_lxml():
+        raise ImportError("parser backend 'lxml' requested but lxml is not installed")
+    return backend
+
+
+_TOKENIZERS = {"lxml": _text_lxml, "html.parser": _text_stdlib, "bs4": _text_bs4}
+
+
+def visible_text(html: str, backend: str = "auto") -> str:
+    return _TOKENIZERS[resolve_backend(backend)](html)
+
+
+# --------------------------------------------------------------------------- #
+#  Field extraction
+# --------------------------------------------------------------------------- #
+
+_LAZY_GAP = re.compile(r"(?<!\\)\.\*\?")
+
+
+def _compile_steps(patt: re.Pattern) -> list[re.Pattern]:
+    """
+    Split `A.*?B.*?(C)` into [A, B, (C)].  Searching each step forward from where
+    the previous one ended finds exactly the match `patt.search` would, because
+    a DOTALL lazy gap accepts anything.  Patterns that do not have that shape
+    fall back to a single step (the pattern itself).
+    """
+    parts = _LAZY_GAP.split(patt.pattern)
+    if len(parts) < 2 or not patt.flags & re.S:
+        return [patt]
+    try:
+        steps = [re.compile(p, patt.flags) for p in parts]
+    except re.error:
+        return [patt]
+    if any(s.groups for s in steps[:-1]) or steps[-1].groups < 1:
+        return [patt]
+    return steps
+
+
+class Extractor:
+    """
+    Compiled form of a {field: pattern} mapping.
+    Steps shared by several fields (e.g. 'Life Expectancy') are searched once per page.
+    """
+
+    def __init__(self, patterns: dict[str, re.Pattern]):
+        self.fields = list(patterns)
+        self._plan = {k: _compile_steps(p) for k, p in patterns.items()}
+
+    def extract_text(self, text: str) -> dict[str, str | None]:
+        out: dict[str, str | None] = {k: None for k in self.fields}
+        ends: dict[tuple, int | None] = {}     # step prefix -> end offset (None = not found)
+        for k, steps in self._plan.items():
+            pos, key = 0, ()
+            for step in steps[:-1]:
+                key += ((step.pattern, step.flags),)
+                if key not in ends:
+                    m = step.search(text, pos)
+                    ends[key] = m.end() if m else None
+                pos = ends[key]
+                if pos is None:
+                    break
+            else:
+                m = steps[-1].search(text, pos)
+                if m:
+                    out[k] = m.group(1).replace(",", "")
+        return out
+
+    def extract(self, html: str, backend: str = "auto") -> dict[str, str | None]:
+        return self.extract_text(visible_text(html, backend))
@@ -1,29 +1,54 @@
 """
 Creates TotalGDP, log transforms, z-score scaling, join & X.npy Q5
+build_features(..., low_memory=True) gathers the joined table once, in float32.
 """
 
 import logging, numpy as np, pandas as pd
-from sklearn.preprocessing import StandardScaler
-from paths import (X_NPY, LOST_COUNTRIES_CSV,
+from pathlib import Path
+from paths import (ensure_dirs, X_NPY, LOST_COUNTRIES_CSV,
                     DEMOGRAPHICS_RAW_CSV,
                     GDP_PER_CAPITA_2021, POPULATION_2021)
 from utils import *
+from country_registry import get_registry
+from report_sink import get_sink
+from running_stats import RunningStats
 from logging_conf import configure_logging
 
-configure_logging()
 log = logging.getLogger("features")
 
 SELECTED = ["LifeExpectancy_Both", "LogGDPperCapita", "LogPopulation"]
 
-def build_features(demo: pd.DataFrame, gdp: pd.DataFrame,
-                    pop: pd.DataFrame) -> tuple[np.ndarray, pd.DataFrame]:
-    # check country is set as index for all dfs
-    for df in [demo, gdp, pop]:
-        if df.index.name != "Country":
-            raise ValueError("Expected 'Country' as index in all DataFrames")
+def scaler_stats(a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Column mean and population std (1 for constant columns), as sklearn's StandardScaler."""
+    a = np.asarray(a, dtype="float64")
+    std = a.std(axis=0)
+    std[std == 0.0] = 1.0
+    return a.mean(axis=0), std
+
+def standardize(a: np.ndarray) -> np.ndarray:
+    """Column z-scores, as sklearn's StandardScaler (population std, constant columns -> 0)."""
+    mean, std = scaler_stats(a)
+    return (np.asarray(a, dtype="float64") - mean) / std
+
+def _by_id(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame indexed by integer CountryID, without the redundant name column."""
+    if df.index.name == "Country":      # plain name-indexed input: resolve through the registry
+        df = df.set_axis(pd.Index(get_registry().ids(df.index.to_series()), name="CountryID"))
+    elif df.index.name != "CountryID":
+        raise ValueError("Expected 'CountryID' (or 'Country') as index in all DataFrames")
+    return df.drop(columns="Country", errors="ignore")
+
+def _join(demo: pd.DataFrame, gdp: pd.DataFrame, pop: pd.DataFrame,
+          check_units: bool = True) -> tuple[pd.DataFrame, pd.Index]:
+    """
+    Derived columns + inner join on CountryID, before imputation; also returns the lost IDs.
+    check_units=False skips the millions heuristic (meaningless on a few patched rows).
+    """
+    # join on integer country IDs
+    demo, gdp, pop = _by_id(demo), _by_id(gdp), _by_id(pop)
     # 5.1 Total GDP ----------------------------------------------------------
     # GIven in absolute numbers
-    if pop["Population"].max() < 1e3:
+    if check_units and pop["Population"].max() < 1e3:
         raise ValueError("Population values appear to be in millions, expected absolute numbers")
     gdp["TotalGDP"] = gdp["GDP_per_capita_PPP"] * pop["Population"]
 
@@ -37,25 +62,167 @@ def build_features(demo: pd.DataFrame, gdp: pd.DataFrame,
 
     # 5.4 inner join ---------------------------------------------------------
     df = demo.join(gdp, how="inner").join(pop, how="inner")
-    lost = (set(demo.index) | set(gdp.index) | set(pop.index)) - set(df.index)
-    pd.Series(sorted(lost)).to_csv(LOST_COUNTRIES_CSV, index=False, header=["Country"])
+    lost = demo.index.union(gdp.index).union(pop.index).difference(df.index)
+    num_cols = df.select_dtypes("number").columns
+    df[num_cols] = df[num_cols].astype("float64")  # to accept mean value which is float64
+    return df, lost
+
+def _join_compact(demo: pd.DataFrame, gdp: pd.DataFrame, pop: pd.DataFrame) -> tuple[pd.DataFrame, pd.Index]:
+    """
+    Low-memory _join: the inner join is a key lookup into gdp / pop, and every output
+    column (derived ones included) is gathered once into a float32 frame - no chained
+    joins, no derived columns added to the inputs, no float64 upcast.
+    """
+    demo, gdp, pop = _by_id(demo), _by_id(gdp), _by_id(pop)
+    if not (gdp.index.is_unique and pop.index.is_unique):
+        df, lost = _join(demo, gdp, pop)
+        return df.astype({c: "float32" for c in df.select_dtypes("number").columns}), lost
+    if pop["Population"].max() < 1e3:
+        raise ValueError("Population values appear to be in millions, expected absolute numbers")
+    if (gdp["GDP_per_capita_PPP"] <= 0).any():
+        raise ValueError("GDP per capita contains non-positive values")
+    if (pop["Population"] <= 0).any():
+        raise ValueError("Population contains non-positive values")
+
+    inner = demo.index.isin(gdp.index) & demo.index.isin(pop.index)
+    ids = demo.index[inner]
+    at_gdp, at_pop = gdp.index.get_indexer(ids), pop.index.get_indexer(ids)
+
+    def f32(s: pd.Series, at=None) -> np.ndarray:
+        a = s.to_numpy()
+        a = a[at] if at is not None else a
+        return a.astype("float32", copy=False) if a.dtype.kind in "iuf" else a
+
+    cols = {c: f32(demo[c], inner) for c in demo.columns}
+    gdp_pc, population = f32(gdp["GDP_per_capita_PPP"], at_gdp), f32(pop["Population"], at_pop)
+    cols.update({c: f32(gdp[c], at_gdp) for c in gdp.columns})
+    cols["TotalGDP"] = gdp_pc * population
+    cols["LogGDPperCapita"] = np.log10(gdp_pc)
+    cols.update({c: f32(pop[c], at_pop) for c in pop.columns})
+    cols["LogPopulation"] = np.log10(population)
+    keys = np.union1d(np.union1d(demo.index.to_numpy(), gdp.index.to_numpy()), pop.index.to_numpy())
+    lost = pd.Index(np.setdiff1d(keys, ids.to_numpy(), assume_unique=True), name="CountryID")
+    return pd.DataFrame(cols, index=ids), lost
+
+def build_features(demo: pd.DataFrame, gdp: pd.DataFrame, pop: pd.DataFrame,
+                   x_path: Path | None = X_NPY,
+                   lost_csv: Path | None = LOST_COUNTRIES_CSV,
+                   low_memory: bool = False) -> tuple[np.ndarray, pd.DataFrame]:
+    df, lost = _join_compact(demo, gdp, pop) if low_memory else _join(demo, gdp, pop)
+    lost = get_registry().names(lost[lost >= 0]).sort_values()
+    if lost_csv is not None:
+        get_sink().to_csv(pd.Series(lost), lost_csv, index=False, header=["Country"])
     log.info("Inner join retained %d countries, lost %d", len(df), len(lost))
+    df = df.set_axis(get_registry().names(df.index))     # back to readable names
 
     # 5.2 handle missing after join -----------------------------------------
     num_cols = df.select_dtypes("number").columns
-    df[num_cols] = df[num_cols].astype("float64")  # to accept mean value which is float64
-    df[num_cols] = df[num_cols].fillna(df[num_cols].mean())
+    if low_memory:      # column by column, only where something is missing
+        for c in num_cols:
+            if df[c].isna().any():
+                df[c] = df[c].fillna(np.nanmean(df[c].to_numpy(), dtype="float64"))
+    else:
+        df[num_cols] = df[num_cols].fillna(df[num_cols].mean())
 
     # 5.3 scaling ------------------------------------------------------------
-    scaler = StandardScaler()
     df = df.sort_index()  # make sure X.npy remains the same throughout different runs
-    X = scaler.fit_transform(df[SELECTED])
-    np.save(X_NPY, X)
-    log.info("Saved feature matrix to %s shape=%s", X_NPY.name, X.shape)
+    X = standardize(df[SELECTED].to_numpy())
+    if x_path is not None:
+        np.save(x_path, X)
+        log.info("Saved feature matrix to %s shape=%s", x_path.name, X.shape)
     return X, df
 
 
+# --------------------------------------------------------------------------- #
+#  Out-of-core variant: chunked join, incremental scaler, memmapped X.npy
+# --------------------------------------------------------------------------- #
+
+def build_features_ooc(demo: pd.DataFrame, gdp: pd.DataFrame, pop: pd.DataFrame,
+                       chunk_rows: int = 100_000, dtype: str = "float64",
+                       merged_csv: Path | None = None,
+                       stats: RunningStats | None = None) -> tuple[np.memmap, pd.Index]:
+    """
+    Same features as build_features, but never materializes the joined table:
+    * inner join = intersection of the integer key sets, rows gathered per chunk
+    * pass 1 accumulates per-column moments (imputation means + scaler statistics)
+    * pass 2 imputes, scales and writes each chunk straight into a memmapped X.npy
+    Returns (X memmap, country names in row order); `merged_csv` optionally
+    receives the imputed joined table, appended chunk by chunk, and `stats`
+    accumulates its summary statistics / correlations in the same pass.
+    """
+    demo, gdp, pop = _by_id(demo), _by_id(gdp), _by_id(pop)
+    if pop["Population"].max() < 1e3:
+        raise ValueError("Population values appear to be in millions, expected absolute numbers")
+    if (gdp["GDP_per_capita_PPP"] <= 0).any():
+        raise ValueError("GDP per capita contains non-positive values")
+    if (pop["Population"] <= 0).any():
+        raise ValueError("Population contains non-positive values")
+    if not demo.index.is_unique:
+        log.warning("Dropping %d duplicate demographics rows", demo.index.duplicated().sum())
+        demo = demo[~demo.index.duplicated()]
+
+    # 5.4 inner join on sorted integer keys -----------------------------------
+    keys = [np.unique(df.index.to_numpy()) for df in (demo, gdp, pop)]
+    ids = np.intersect1d(np.intersect1d(keys[0], keys[1], assume_unique=True), keys[2], assume_unique=True)
+    lost = np.setdiff1d(np.union1d(np.union1d(keys[0], keys[1]), keys[2]), ids, assume_unique=True)
+    reg = get_registry()
+    lost = reg.names(lost[lost >= 0]).sort_values()
+    get_sink().to_csv(pd.Series(lost), LOST_COUNTRIES_CSV, index=False, header=["Country"])
+    log.info("Inner join retained %d countries, lost %d", len(ids), len(lost))
+
+    names = reg.names(ids)
+    order = np.argsort(names.to_numpy(dtype=str), kind="stable")   # same row order as sort_index()
+    ids, names = ids[order], names[order]
+
+    def joined(chunk_ids: np.ndarray) -> pd.DataFrame:
+        g = gdp.iloc[gdp.index.get_indexer(chunk_ids)].copy()
+        p = pop.iloc[pop.index.get_indexer(chunk_ids)].copy()
+        g["TotalGDP"] = g["GDP_per_capita_PPP"].to_numpy() * p["Population"].to_numpy()
+        g["LogGDPperCapita"] = np.log10(g["GDP_per_capita_PPP"])
+        p["LogPopulation"] = np.log10(p["Population"])
+        parts = [demo.iloc[demo.index.get_indexer(chunk_ids)], g, p]
+        df = pd.concat([x.set_axis(pd.RangeIndex(len(chunk_ids))) for x in parts], axis=1)
+        num_cols = df.select_dtypes("number").columns
+        df[num_cols] = df[num_cols].astype("float64")
+        return df
+
+    bounds = range(0, len(ids), chunk_rows)
+
+    # pass 1: moments -----------------------------------------------------------
+    moments = None
+    for start in bounds:
+        df = joined(ids[start:start + chunk_rows])
+        num = df.select_dtypes("number")
+        if moments is None:
+            moments = RunningStats(list(num.columns), quantiles=False, corr=False)
+        moments.update(num)
+    if moments is None:
+        raise ValueError("Inner join is empty - nothing to scale")
+    means = pd.Series(moments.mean, index=moments.columns)
+    # imputed rows sit exactly on the mean, so they add 0 to M2 but count in n
+    scale = np.sqrt(pd.Series(moments.m2, index=moments.columns)[SELECTED] / len(ids)).replace(0.0, 1.0)
+
+    # pass 2: impute, scale, write ------------------------------------------
+    X = np.lib.format.open_memmap(X_NPY, mode="w+", dtype=dtype, shape=(len(ids), len(SELECTED)))
+    for start in bounds:
+        chunk_ids = ids[start:start + chunk_rows]
+        df = joined(chunk_ids)
+        num_cols = df.select_dtypes("number").columns
+        df[num_cols] = df[num_cols].fillna(means[num_cols])
+        X[start:start + len(chunk_ids)] = ((df[SELECTED] - means[SELECTED]) / scale).to_numpy()
+        if stats is not None:
+            stats.update(df[num_cols])
+        if merged_csv is not None:
+            df.set_axis(names[start:start + len(chunk_ids)]).to_csv(
+                merged_csv, mode="w" if start == 0 else "a", header=start == 0)
+    X.flush()
+    log.info("Saved feature matrix to %s shape=%s dtype=%s (out-of-core)", X_NPY.name, X.shape, dtype)
+    return X, names
+
+
 if __name__ == "__main__":
+    configure_logging()
+    ensure_dirs()
     demographics_df = load_df(DEMOGRAPHICS_RAW_CSV)
     gdp_df = load_df(GDP_PER_CAPITA_2021)
     pop_df = load_df(POPULATION_2021)
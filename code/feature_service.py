@@ -0,0 +1,248 @@
+"""
+Long-running feature service.
+Keeps the merged table and the scaled matrix X in memory, indexed by country
+(spelling-insensitive, through the registry's normalize_name), and answers
+JSON queries over HTTP or HTTP on a Unix socket:
+
+    GET  /features/<country>                 one row: X vector + merged fields
+    GET  /features?country=A&country=B       batch
+    POST /features  {"countries": [...]}     batch
+    GET  /summary[/<column>]                 RunningStats summary of the merged table
+    GET  /corr                               pairwise correlation matrix
+    GET  /health                             snapshot version, rows, cache hit rate
+
+Results come from an LRU cache.  The output files are polled; when X.npy or
+merged.csv change, a new snapshot is loaded next to the old one and swapped
+in (and the cache cleared) without a restart.
+
+    python feature_service.py --port 8700
+    python feature_service.py --unix /tmp/features.sock
+"""
+
+from __future__ import annotations
+import json, logging, argparse, threading, socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+import numpy as np
+from paths import X_NPY
+from utils import load_df, table_path
+from country_registry import normalize_name
+from running_stats import RunningStats
+from logging_conf import configure_logging
+
+log = logging.getLogger("service")
+
+
+def _jsonable(obj):
+    """NaN / inf -> None, numpy scalars -> Python, recursively."""
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    if isinstance(obj, (np.generic,)):
+        obj = obj.item()
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+
+class FeatureIndex:
+    """One immutable snapshot of the pipeline outputs."""
+
+    def __init__(self, merged_path: Path, x_path: Path):
+        self.sources = (table_path(merged_path), x_path)
+        self.version = tuple(p.stat().st_mtime_ns for p in self.sources)
+        merged = load_df(merged_path)
+        if "Country" in merged.columns:
+            merged = merged.set_index("Country")
+        X = np.load(x_path)
+        if len(X) != len(merged):
+            raise ValueError(f"{x_path.name} has {len(X)} rows but {merged_path.name} has {len(merged)}")
+        self.merged, self.X = merged, X
+        self.rows = {normalize_name(str(name)): i for i, name in enumerate(merged.index)}
+        self.stats = RunningStats().update(merged.select_dtypes("number"))
+        self.summary = self.stats.summary()
+
+    def row(self, country: str) -> dict | None:
+        i = self.rows.get(normalize_name(country))
+        if i is None:
+            return None
+        return {"country": self.merged.index[i], "x": self.X[i].tolist(),
+                "fields": self.merged.iloc[i].to_dict()}
+
+
+class FeatureService:
+    def __init__(self, merged_path: Path, x_path: Path = X_NPY, cache_size: int = 1024):
+        self.merged_path, self.x_path = merged_path, x_path
+        self.cache_size = cache_size
+        self.index = FeatureIndex(merged_path, x_path)
+        self.hits = self.misses = self.reloads = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        log.info("Serving %d countries from %s + %s", len(self.index.rows), *[p.name for p in self.index.sources])
+
+    # ---- queries ---------------------------------------------------------- #
+    def _cached(self, key: tuple, compute):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            index, generation = self.index, self.reloads     # the snapshot this value comes from
+        value = _jsonable(compute(index))
+        with self._lock:
+            self.misses += 1
+            if generation == self.reloads:      # a reload in between would make it stale
+                self._cache[key] = value
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return value
+
+    def features(self, countries: list[str]) -> list[dict | None]:
+        return [self._cached(("row", normalize_name(c)), lambda ix, c=c: ix.row(c)) for c in countries]
+
+    def summary(self, column: str | None = None) -> dict | None:
+        def compute(ix):
+            if column is None:
+                return ix.summary.to_dict(orient="index")
+            return ix.summary.loc[column].to_dict() if column in ix.summary.index else None
+        return self._cached(("summary", column), compute)
+
+    def corr(self) -> dict:
+        return self._cached(("corr",), lambda ix: ix.stats.corr().to_dict(orient="index"))
+
+    def health(self) -> dict:
+        total = self.hits + self.misses
+        return {"rows": len(self.index.rows), "version": list(self.index.version), "reloads": self.reloads,
+                "cache_entries": len(self._cache), "hit_rate": self.hits / total if total else None}
+
+    # ---- reload ----------------------------------------------------------- #
+    def reload_if_changed(self) -> bool:
+        try:
+            version = tuple(p.stat().st_mtime_ns for p in (table_path(self.merged_path), self.x_path))
+            if version == self.index.version:
+                return False
+            index = FeatureIndex(self.merged_path, self.x_path)      # built aside, old one keeps serving
+        except (OSError, ValueError) as exc:    # e.g. a run is still writing the outputs; retry next poll
+            log.warning("Reload skipped: %s", exc)
+            return False
+        with self._lock:
+            self.index = index
+            self._cache.clear()
+            self.reloads += 1
+        log.info("Reloaded outputs: %d countries", len(index.rows))
+        return True
+
+    def watch(self, interval: float) -> threading.Thread:
+        def loop():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+        t = threading.Thread(target=loop, name="output-watcher", daemon=True)
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# --------------------------------------------------------------------------- #
+#  HTTP front end (TCP or Unix socket)
+# --------------------------------------------------------------------------- #
+
+class _Handler(BaseHTTPRequestHandler):
+    service: FeatureService       # set on the server-specific subclass
+
+    def _send(self, status: int, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, path: str, countries: list[str]) -> None:
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        svc = self.service
+        if parts[:1] == ["features"]:
+            if len(parts) == 2:
+                row = svc.features([parts[1]])[0]
+                return self._send(200, row) if row else self._send(404, {"error": f"unknown country {parts[1]!r}"})
+            if countries:
+                return self._send(200, dict(zip(countries, svc.features(countries))))
+        elif parts[:1] == ["summary"] and len(parts) <= 2:
+            res = svc.summary(parts[1] if len(parts) == 2 else None)
+            return self._send(200, res) if res is not None else self._send(404, {"error": "unknown column"})
+        elif parts == ["corr"]:
+            return self._send(200, svc.corr())
+        elif parts == ["health"]:
+            return self._send(200, svc.health())
+        self._send(404, {"error": f"no route for {path}"})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self._route(url.path, parse_qs(url.query).get("country", []))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            countries = list(body.get("countries", []))
+        except (ValueError, AttributeError):
+            return self._send(400, {"error": "expected JSON body {\"countries\": [...]}"})
+        self._route(url.path, countries)
+
+    def log_message(self, fmt, *args):
+        log.debug("%s %s", self.command, fmt % args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _ = super().get_request()
+        return conn, ("unix", 0)        # BaseHTTPRequestHandler expects a (host, port) address
+
+
+def serve(service: FeatureService, host: str = "127.0.0.1", port: int = 8700,
+          unix: Path | None = None, poll: float = 2.0) -> None:
+    handler = type("Handler", (_Handler,), {"service": service})
+    if unix is not None:
+        if unix.exists():
+            unix.unlink()
+        server = _UnixHTTPServer(str(unix), handler)
+        where = f"unix:{unix}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        where = f"http://{host}:{server.server_address[1]}"
+    if poll > 0:
+        service.watch(poll)
+    log.info("Feature service listening on %s", where)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+        if unix is not None and unix.exists():
+            unix.unlink()
+
+
+if __name__ == "__main__":
+    configure_logging(logging.INFO)
+    ap = argparse.ArgumentParser(description="Serve feature vectors and summaries from the pipeline outputs")
+    ap.add_argument("--merged", type=Path, default=Path("merged.csv"),
+                    help="Merged table written by main_pipeline (default: ./merged.csv)")
+    ap.add_argument("--x", type=Path, default=X_NPY, help=f"Scaled matrix (default: {X_NPY.name})")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8700)
+    ap.add_argument("--unix", type=Path, default=None, metavar="PATH", help="Listen on a Unix socket instead")
+    ap.add_argument("--cache-size", type=int, default=1024, help="LRU result cache entries")
+    ap.add_argument("--poll", type=float, default=2.0, metavar="SECONDS",
+                    help="Check the outputs for changes this often (0 = never reload)")
+    args = ap.parse_args()
+    serve(FeatureService(args.merged, args.x, cache_size=args.cache_size),
+          host=args.host, port=args.port, unix=args.unix, poll=args.poll)
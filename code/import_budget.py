@@ -0,0 +1,89 @@
+"""
+Import-time budget check for the pipeline modules.
+Each module is imported in a fresh interpreter (best of N) and must
+* import within `--budget-ms` of the unavoidable floor (numpy + pandas),
+* not pull in a heavy dependency it does not need (requests, bs4, sklearn, lxml),
+* have no side effects: no logging handlers installed, no output directory created.
+
+    python import_budget.py                  # exit code 1 if any module is over budget
+    python import_budget.py --budget-ms 100 --repeat 7
+"""
+
+from __future__ import annotations
+import os, sys, json, logging, argparse, tempfile, subprocess
+from pathlib import Path
+from logging_conf import configure_logging
+
+log = logging.getLogger("imports")
+
+CODE_DIR = Path(__file__).resolve().parent
+
+# module -> heavy dependencies it must not import by itself
+MODULES = {
+    "paths":               ["pandas", "numpy"],
+    "utils":               ["requests", "bs4", "sklearn"],
+    "io_load":             ["requests", "bs4", "sklearn"],
+    "cleaning":            ["requests", "bs4", "sklearn"],
+    "feature_engineering": ["requests", "bs4", "sklearn"],
+    "stage_cache":         ["requests", "bs4", "sklearn"],
+    "scheduler":           ["pandas", "numpy"],
+    "schemas":             ["pandas", "numpy"],
+    "main_pipeline":       ["requests", "bs4", "sklearn", "lxml"],
+}
+HEAVY = sorted({m for mods in MODULES.values() for m in mods})
+
+_PROBE = """
+import sys, time, json, logging
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+print(json.dumps({{"s": dt, "handlers": len(logging.getLogger().handlers),
+                  "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+_FLOOR = "import time; t0 = time.perf_counter(); import numpy, pandas; print(time.perf_counter() - t0)"
+
+
+def _python(code: str, env: dict) -> str:
+    return subprocess.run([sys.executable, "-c", code], cwd=CODE_DIR, env=env, check=True,
+                          capture_output=True, text=True).stdout.strip().splitlines()[-1]
+
+
+def probe(module: str, repeat: int, env: dict) -> dict:
+    runs = [json.loads(_python(_PROBE.format(module=module, heavy=HEAVY), env)) for _ in range(repeat)]
+    return {"s": min(r["s"] for r in runs), "handlers": runs[0]["handlers"], "loaded": runs[0]["loaded"]}
+
+
+def check(budget_ms: float, repeat: int) -> list[str]:
+    """Names of modules that break the budget or have import-time side effects."""
+    with tempfile.TemporaryDirectory(prefix="import-budget-") as tmp:
+        out_dir = Path(tmp) / "out"     # must stay absent
+        env = {**os.environ, "PIPELINE_OUT_DIR": str(out_dir)}
+        floor = min(float(_python(_FLOOR, env)) for _ in range(repeat))
+        log.info("floor (numpy + pandas): %.0f ms, budget: floor + %.0f ms", floor * 1e3, budget_ms)
+        failures = []
+        for module, forbidden in MODULES.items():
+            r = probe(module, repeat, env)
+            problems = [f"imports {m}" for m in r["loaded"] if m in forbidden]
+            if r["s"] - floor > budget_ms / 1e3:
+                problems.append(f"{(r['s'] - floor) * 1e3:.0f} ms over the floor")
+            if r["handlers"]:
+                problems.append("configures logging")
+            if out_dir.exists():
+                problems.append("creates the output directory")
+            log.info("%-20s %7.0f ms  %s", module, r["s"] * 1e3, "; ".join(problems) or "ok")
+            if problems:
+                failures.append(module)
+    return failures
+
+
+if __name__ == "__main__":
+    configure_logging()
+    ap = argparse.ArgumentParser(description="Import-time budget check")
+    ap.add_argument("--budget-ms", type=float, default=250.0,
+                    help="Allowed import time on top of numpy + pandas (default 250 ms)")
+    ap.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module, best is kept")
+    args = ap.parse_args()
+    bad = check(args.budget_ms, args.repeat)
+    if bad:
+        log.error("%d module(s) over budget: %s", len(bad), ", ".join(bad))
+        sys.exit(1)
@@ -0,0 +1,158 @@
+"""
+Incremental feature updates.
+Keeps the three cleaned sources, the raw (not yet imputed) join and running
+sums of every numeric column, so a change to a few countries only re-joins
+those countries and patches their rows of X.npy:
+
+* imputation means and scaler statistics are frozen at the last full build;
+  patched rows are imputed / scaled with them, the other rows are untouched
+* the running sums (shifted, so removals subtract exactly) track where the
+  statistics have moved; once a SELECTED column's mean or std drifts by more
+  than `drift_tol` (in units of the frozen std), everything is rescaled
+
+Rows keep build_features' order (sorted by country name); value changes are
+written into X.npy in place (memmap), added / removed countries rewrite the
+file from the existing rows without refitting anything.
+
+    inc = IncrementalFeatures(demo_clean, gdp_clean, pop_clean)
+    inc.update(gdp=changed_gdp_rows, removed=["Atlantis"])
+"""
+
+from __future__ import annotations
+import logging
+import numpy as np, pandas as pd
+from pathlib import Path
+from typing import Iterable
+import feature_engineering as fe
+from feature_engineering import SELECTED
+from country_registry import get_registry
+from paths import X_NPY
+
+log = logging.getLogger("incremental")
+
+
+class IncrementalFeatures:
+    def __init__(self, demo: pd.DataFrame, gdp: pd.DataFrame, pop: pd.DataFrame,
+                 x_path: Path = X_NPY, drift_tol: float = 0.05):
+        self.sources = {"demo": fe._by_id(demo), "gdp": fe._by_id(gdp), "pop": fe._by_id(pop)}
+        self.x_path = x_path
+        self.drift_tol = drift_tol
+        self.rebuild()
+
+    # ---- full build ------------------------------------------------------- #
+    def rebuild(self, sources: dict[str, pd.DataFrame] | None = None) -> np.ndarray:
+        """Join everything, refit imputation means + scaler, rewrite X (same result as build_features)."""
+        sources = self.sources if sources is None else sources
+        raw, _ = fe._join(sources["demo"], sources["gdp"], sources["pop"])
+        num_cols = raw.select_dtypes("number").columns
+        fill = raw[num_cols].mean()
+        order = self._sorted_ids(raw.index)
+        imputed = raw.loc[order, SELECTED].fillna(fill[SELECTED]).to_numpy()
+        mu, sd = fe.scaler_stats(imputed)
+        X = (imputed - mu) / sd
+        np.save(self.x_path, X)
+
+        self.sources, self.raw, self.order = sources, raw, order
+        self.num_cols, self.fill, self.mu, self.sd = num_cols, fill, mu, sd
+        self._ref = fill.to_numpy()                # shift for the running sums
+        self._sums, self._rows = self._sums_of(raw), len(raw)
+        log.info("Full rebuild: %s shape=%s", self.x_path.name, X.shape)
+        return X
+
+    @staticmethod
+    def _sorted_ids(ids: pd.Index) -> pd.Index:
+        names = get_registry().names(ids)
+        return pd.Index(ids[np.argsort(names.to_numpy(dtype=str), kind="stable")], name="CountryID")
+
+    # ---- running sums ----------------------------------------------------- #
+    def _sums_of(self, rows: pd.DataFrame) -> np.ndarray:
+        """Per numeric column: count, shifted sum and shifted sum of squares of the present values."""
+        vals = rows[self.num_cols].to_numpy(dtype="float64")
+        present = ~np.isnan(vals)
+        d = np.where(present, vals - self._ref, 0.0)
+        return np.stack([present.sum(axis=0), d.sum(axis=0), (d * d).sum(axis=0)])
+
+    def current_stats(self, sums: np.ndarray | None = None, rows: int | None = None) -> tuple[pd.Series, pd.Series]:
+        """Mean and (imputed-column, population) std of every numeric column right now (or for `sums`)."""
+        n, s1, s2 = self._sums if sums is None else sums
+        rows = self._rows if rows is None else rows
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self._ref + s1 / n
+            m2 = np.maximum(s2 - s1 ** 2 / n, 0.0)
+            std = np.sqrt(m2 / rows)
+        return pd.Series(mean, index=self.num_cols), pd.Series(std, index=self.num_cols)
+
+    def drift(self, sums: np.ndarray | None = None, rows: int | None = None) -> float:
+        """Largest move of a SELECTED column's mean or std since the last full build, in frozen-std units."""
+        mean, std = self.current_stats(sums, rows)
+        shift = np.abs(mean[SELECTED].to_numpy() - self.mu) / self.sd
+        spread = np.abs(std[SELECTED].to_numpy() / self.sd - 1)
+        return float(np.nanmax(np.concatenate([shift, spread])))
+
+    # ---- updates ---------------------------------------------------------- #
+    def update(self, demo: pd.DataFrame | None = None, gdp: pd.DataFrame | None = None,
+               pop: pd.DataFrame | None = None, removed: Iterable[str] = ()) -> dict:
+        """
+        Apply changed / added source rows (same layout as the cleaned frames, only the
+        affected countries) and removed country names; patch X accordingly.
+        The new state is built on copies and only kept once the patch has joined and
+        X is written, so a rejected patch leaves the sources, sums and X as they were.
+        """
+        patches = {k: fe._by_id(v) for k, v in (("demo", demo), ("gdp", gdp), ("pop", pop)) if v is not None}
+        reg, gone_ids = get_registry(), []
+        for name in removed:
+            cid = reg.lookup(name)
+            if cid is None:
+                log.warning("Cannot remove %r: not a known country", name)
+            else:
+                gone_ids.append(cid)
+        gone = pd.Index(gone_ids, dtype="int64", name="CountryID")
+        affected, sources = gone, dict(self.sources)
+        for name, rows in patches.items():
+            sources[name] = pd.concat([sources[name].drop(rows.index, errors="ignore"), rows])
+            affected = affected.union(rows.index)
+        sources = {name: src.drop(gone, errors="ignore") for name, src in sources.items()}
+
+        old = self.raw.loc[self.raw.index.intersection(affected)]
+        parts = [src.loc[src.index.intersection(affected)] for src in sources.values()]
+        new, _ = fe._join(*parts, check_units=False)        # raises on a bad patch
+        new = new.reindex(columns=self.raw.columns)
+        raw = pd.concat([self.raw.drop(old.index), new])
+        sums = self._sums - self._sums_of(old) + self._sums_of(new)
+        n_rows = self._rows - len(old) + len(new)
+
+        info = {"patched": len(old.index.intersection(new.index)),
+                "added": len(new.index.difference(old.index)),
+                "removed": len(old.index.difference(new.index)),
+                "drift": self.drift(sums, n_rows), "rescaled": False}
+        if info["drift"] > self.drift_tol:
+            log.info("Statistics drifted by %.3f (> %.3f): full rescale", info["drift"], self.drift_tol)
+            self.rebuild(sources)
+            info["rescaled"] = True
+            return info
+
+        rows = ((new[SELECTED].fillna(self.fill[SELECTED]) - self.mu) / self.sd).to_numpy()
+        order = self.order
+        if not info["added"] and not info["removed"]:
+            X = np.load(self.x_path, mmap_mode="r+")
+            X[order.get_indexer(new.index)] = rows
+            X.flush()
+        else:
+            X_old = np.load(self.x_path)
+            order = self._sorted_ids(raw.index)
+            X = np.empty((len(order), len(SELECTED)), dtype=X_old.dtype)
+            kept = ~order.isin(new.index)
+            X[kept] = X_old[self.order.get_indexer(order[kept])]
+            X[order.get_indexer(new.index)] = rows
+            np.save(self.x_path, X)
+        self.sources, self.raw, self.order = sources, raw, order
+        self._sums, self._rows = sums, n_rows
+        log.info("Incremental update: %(patched)d patched, %(added)d added, %(removed)d removed "
+                 "(drift %(drift).4f)", info)
+        return info
+
+    def merged(self) -> pd.DataFrame:
+        """The imputed joined table in X's row order, indexed by country name (like build_features)."""
+        df = self.raw.loc[self.order].copy()
+        df[self.num_cols] = df[self.num_cols].fillna(self.fill)
+        return df.set_axis(get_registry().names(self.order))
@@ -0,0 +1,105 @@
+"""
+Per-stage instrumentation for the pipeline.
+Each stage records wall time, CPU time, peak traced memory (tracemalloc) and
+rows in / out; the run is written as a JSON report, and every stage can
+optionally be profiled into <profile_dir>/<stage>.prof (cProfile).
+Stages may run concurrently (scheduler.py); the peak is then only reset when
+no other stage is running, so an overlapped stage's peak_mem_bytes is the peak
+of the whole overlap window (its own and the other stages' allocations).
+"""
+
+from __future__ import annotations
+import json, time, logging, platform, threading, tracemalloc, cProfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+log = logging.getLogger("instrument")
+
+
+def n_rows(obj: Any) -> int | None:
+    """Row count of a DataFrame / array / dict of them (None if not tabular)."""
+    if isinstance(obj, dict):
+        counts = [n_rows(v) for v in obj.values()]
+        return sum(c for c in counts if c is not None) if any(c is not None for c in counts) else None
+    shape = getattr(obj, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+class Instrument:
+    """
+    Collects StageRecords.  A disabled instrument only runs the code, so the
+    pipeline can always go through it.
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True,
+                 profile_dir: Path | None = None):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.profile_dir = profile_dir if enabled else None
+        self.stages: list[dict] = []
+        self._active = 0        # stages currently tracing memory
+        self._tracing = False   # tracemalloc was started by this instrument
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._started = datetime.now().isoformat(timespec="seconds")
+        if self.profile_dir is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None) -> Iterator[dict]:
+        """Measure the enclosed block; set rec['rows_out'] inside it if known."""
+        rec = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        if not self.enabled:
+            yield rec
+            return
+        if self.trace_memory:
+            with self._lock:
+                if self._active == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._tracing = True
+                if self._active == 0:     # never wipe the peak of a stage still running
+                    tracemalloc.reset_peak()
+                self._active += 1
+                mem0 = tracemalloc.get_traced_memory()[0]
+        prof = cProfile.Profile() if self.profile_dir is not None else None
+        w0, c0 = time.perf_counter(), time.process_time()
+        if prof:
+            prof.enable()
+        try:
+            yield rec
+        finally:
+            if prof:
+                prof.disable()
+                prof.dump_stats(self.profile_dir / f"{name}.prof")
+            rec["wall_s"] = round(time.perf_counter() - w0, 6)
+            rec["cpu_s"] = round(time.process_time() - c0, 6)
+            if self.trace_memory:
+                with self._lock:
+                    rec["peak_mem_bytes"] = tracemalloc.get_traced_memory()[1] - mem0
+                    self._active -= 1
+                    if self._active == 0 and self._tracing:
+                        tracemalloc.stop()
+                        self._tracing = False
+            self.stages.append(rec)
+            log.debug("stage %-18s wall=%.3fs cpu=%.3fs rows %s -> %s", name,
+                      rec["wall_s"], rec["cpu_s"], rec["rows_in"], rec["rows_out"])
+
+    def call(self, name: str, fn: Callable, *args, **kwargs):
+        """Run fn(*args) as a stage; rows in/out are taken from the first argument / result."""
+        with self.stage(name, rows_in=n_rows(args[0]) if args else None) as rec:
+            out = fn(*args, **kwargs)
+            rec["rows_out"] = n_rows(out[0] if isinstance(out, tuple) else out)
+        return out
+
+    def report(self, **extra) -> dict:
+        return {"started": self._started, "python": platform.python_version(),
+                "total_wall_s": round(time.perf_counter() - self._t0, 6),
+                "stages": self.stages, **extra}
+
+    def write(self, path: Path, **extra) -> None:
+        if not self.enabled:
+            return
+        path.write_text(json.dumps(self.report(**extra), indent=2))
+        log.info("Wrote run report to %s", path)
@@ -1,47 +1,185 @@
 """
 Utility loaders for the provided 2021 GDP & Population CSVs (3.2)
 Also saves "before/after sort" previews + describe tables.
+Inputs are read against their declared schemas (schemas.py): the header is
+verified first, then numeric columns are parsed natively in one pass
+(pyarrow's CSV reader when installed, else pandas' C parser with `thousands`).
 """
 
-import logging, pandas as pd
+import csv, logging, pandas as pd
 from pathlib import Path
-from paths import (GDP_PER_CAPITA_2021, POPULATION_2021,
+from typing import Iterator
+from paths import (ensure_dirs, GDP_PER_CAPITA_2021, POPULATION_2021,
     GDP_BEFORE_SORT_CSV, GDP_AFTER_SORT_CSV, POP_BEFORE_SORT_CSV,
     POP_AFTER_SORT_CSV, GDP_DESCRIBE_CSV, POP_DESCRIBE_CSV)
 from utils import *
+from running_stats import RunningStats
+from schemas import TableSchema, GDP_SCHEMA, POP_SCHEMA, DEMOGRAPHICS_SCHEMA
+from report_sink import get_sink
 from logging_conf import configure_logging
 
-configure_logging()
 log = logging.getLogger("io")
 
-def _verify_columns(df: pd.DataFrame, wanted: list[str], file: Path):
-    missing = [c for c in wanted if c not in df.columns]
+ENGINES = ("auto", "pyarrow", "c")
+ENGINE = "auto"
+
+
+def set_engine(engine: str) -> None:
+    """Select the CSV parser for schema reads ('auto' = pyarrow if installed)."""
+    global ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown CSV engine {engine!r}; choose from {ENGINES}")
+    if engine == "pyarrow":
+        import pyarrow  # noqa: F401  - optional dependency, fail early if missing
+    ENGINE = engine
+
+
+def _have_pyarrow() -> bool:
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_header(path: Path) -> list[str]:
+    # utf-8-sig: a byte-order mark (Excel exports) is not part of the first column name;
+    # pandas' C parser and pyarrow skip it as well
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def _verify_columns(header: list[str], schema: TableSchema, file: Path) -> list[str]:
+    """Check the header against the schema; returns the schema columns present in the file."""
+    missing = schema.missing(header)
     if missing:
         raise ValueError(f"{file.name}: missing columns {missing}")
+    return [c for c in header if c in schema.columns]
+
+
+def _coerce_numeric(df: pd.DataFrame, schema: TableSchema, file: Path) -> pd.DataFrame:
+    """
+    Fallback for numeric columns the parser left as text (stray tokens): coerce them to NaN.
+    Integer columns are then cast to int64 unless they hold missing values.
+    """
+    for col in schema.numeric:
+        if col in df and not pd.api.types.is_numeric_dtype(df[col]):
+            log.debug("%s: %s has non-numeric values, coercing", file.name, col)
+            text = df[col].astype(str)
+            if schema.thousands:
+                text = text.str.replace(schema.thousands, "", regex=False)
+            df[col] = pd.to_numeric(text, errors="coerce")
+    for col in schema.integer:
+        # the parsers read counts as float64 (NaN, thousands stripped as text); integral and complete -> int64
+        if col in df and df[col].dtype.kind == "f" and df[col].notna().all() and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype("int64")
+    return df
+
+
+def _read_arrow(path: Path, schema: TableSchema, columns: list[str]) -> pd.DataFrame:
+    import pyarrow as pa, pyarrow.compute as pc, pyarrow.csv as pacsv
+    numeric = [c for c in columns if c in schema.numeric]
+    # with a thousands separator numbers are read as text and stripped / cast inside Arrow
+    raw_type = pa.string() if schema.thousands else pa.float64()
+    table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+        include_columns=columns, null_values=list(schema.na_values), strings_can_be_null=True,
+        column_types={c: (pa.string() if schema.columns[c] == "string" else raw_type) for c in columns}))
+    for col in numeric if schema.thousands else ():
+        stripped = pc.replace_substring(table[col], schema.thousands, "")
+        try:
+            table = table.set_column(table.column_names.index(col), col, pc.cast(stripped, pa.float64()))
+        except pa.ArrowInvalid:
+            pass        # stray tokens: left as text for _coerce_numeric
+    return table.to_pandas()
+
 
-def load_gdp(path: Path) -> pd.DataFrame:
-    df = load_df(path=path)
-    _verify_columns(df, ["Country", "GDP_per_capita_PPP"], path)
-    # added astype(str) because I heard some students had to, it worked for me without it either
-    df["GDP_per_capita_PPP"] = pd.to_numeric(df["GDP_per_capita_PPP"].astype(str).str.replace(",", ""), errors="coerce")
+def read_table(path: Path, schema: TableSchema) -> pd.DataFrame:
+    """Read a CSV input per `schema`: header check, then one typed pass over the body."""
+    columns = _verify_columns(read_header(path), schema, path)
+    log.debug(f'Reading {path.name} file')
+    if ENGINE == "pyarrow" or (ENGINE == "auto" and _have_pyarrow()):
+        try:
+            df = _read_arrow(path, schema, columns)
+        except Exception as e:      # e.g. a stray token in a column typed float64
+            log.debug("%s: pyarrow read failed (%s), using the C parser", path.name, e)
+        else:
+            return _coerce_numeric(df, schema, path)
+    df = pd.read_csv(path, usecols=columns, thousands=schema.thousands,
+                     na_values=list(schema.na_values), keep_default_na=False)
+    return _coerce_numeric(df[columns], schema, path)
+
+
+def _write_describe(df: pd.DataFrame, path: Path) -> None:
+    df.describe().to_csv(path)
+
+def load_gdp(path: Path, previews: bool = True) -> pd.DataFrame:
+    df = read_table(path, GDP_SCHEMA)
+    if not previews:      # e.g. panel workers: the mandated previews describe the single-year input
+        return df
     store_head(df, head=5, path=GDP_BEFORE_SORT_CSV)
     store_head(df, head=5, path=GDP_AFTER_SORT_CSV, sorted="Country")
-    df.describe().to_csv(GDP_DESCRIBE_CSV)
+    if get_sink().enabled:   # describe runs on the report sink's thread, off the critical path
+        get_sink().submit(_write_describe, df[["GDP_per_capita_PPP"]].copy(), GDP_DESCRIBE_CSV)
     return df
 
-def load_pop(path: Path) -> pd.DataFrame:
-    log.debug(f'Reading {path.name} file')
-    df = pd.read_csv(path, na_values=["None"])
-    _verify_columns(df, ["Country", "Population"], path)
-    # added astype(str) because I heard some students had to, it worked for me without it either
-    df["Population"] = pd.to_numeric(df["Population"].astype(str).str.replace(",",""), errors="coerce")
+def load_pop(path: Path, previews: bool = True) -> pd.DataFrame:
+    df = read_table(path, POP_SCHEMA)
+    if not previews:
+        return df
     store_head(df, head=5, path=POP_BEFORE_SORT_CSV)
     store_head(df, head=5, path=POP_AFTER_SORT_CSV, sorted="Country")
-    df.describe().to_csv(POP_DESCRIBE_CSV)
+    if get_sink().enabled:   # describe runs on the report sink's thread, off the critical path
+        get_sink().submit(_write_describe, df[["Population"]].copy(), POP_DESCRIBE_CSV)
     return df
 
 
+def load_demographics(path: Path) -> pd.DataFrame:
+    """The crawled table: its columnar copy if preferred (already typed), else the CSV per schema."""
+    src = table_path(path)
+    return load_df(path) if src.suffix == ".feather" else read_table(src, DEMOGRAPHICS_SCHEMA)
+
+
+def _read_chunks(path: Path, schema: TableSchema, chunksize: int,
+                 before_csv: Path, after_csv: Path, describe_csv: Path) -> Iterator[pd.DataFrame]:
+    """
+    Streaming counterpart of load_gdp / load_pop: yields numeric-converted chunks.
+    Previews and the describe table are built incrementally (running 5 smallest
+    countries, RunningStats moments + quantile sketch) and written at the end.
+    """
+    columns = _verify_columns(read_header(path), schema, path)
+    value_col = schema.numeric[0]
+    reader = pd.read_csv(path, usecols=columns, thousands=schema.thousands,
+                         na_values=list(schema.na_values), keep_default_na=False, chunksize=chunksize)
+    acc, smallest = RunningStats([value_col], corr=False), None
+    for i, chunk in enumerate(reader):
+        chunk = _coerce_numeric(chunk[columns], schema, path)
+        if i == 0:
+            store_head(chunk, head=5, path=before_csv)
+        smallest = smallest_rows(pd.concat([smallest, chunk]), 5, "Country")
+        acc.update(chunk[value_col])
+        yield chunk
+
+    if smallest is not None:
+        store_head(smallest, head=5, path=after_csv)
+    s = acc.summary().iloc[0]
+    q1, q2, q3 = acc.quantile([0.25, 0.5, 0.75])[:, 0]
+    desc = pd.DataFrame({value_col: [s["count"], s["mean"], s["std"], s["min"], q1, q2, q3, s["max"]]},
+                        index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"])
+    get_sink().to_csv(desc, describe_csv)
+
+
+def read_gdp_chunks(path: Path, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    return _read_chunks(path, GDP_SCHEMA, chunksize,
+                        GDP_BEFORE_SORT_CSV, GDP_AFTER_SORT_CSV, GDP_DESCRIBE_CSV)
+
+def read_pop_chunks(path: Path, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    return _read_chunks(path, POP_SCHEMA, chunksize,
+                        POP_BEFORE_SORT_CSV, POP_AFTER_SORT_CSV, POP_DESCRIBE_CSV)
+
+
 if __name__ == "__main__":
+    configure_logging()
+    ensure_dirs()
     gdp_df = load_gdp(GDP_PER_CAPITA_2021)
     log_metadata(name='GDP', df=gdp_df)
 
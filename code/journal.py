@@ -0,0 +1,87 @@
+"""
+Append-only JSON Lines journal of crawled records.
+Every record is written (and flushed) as soon as it is parsed, so an
+interrupted crawl keeps everything finished so far; reopening with
+resume=True knows which keys are done and continues appending.  A torn last
+line (crash mid-write) is ignored.  compact() returns the latest record per
+key in a given order, for writing the final table.
+
+The journal bounds what a crash loses, not memory: compact() holds one record
+per key, and the crawler builds the final table from them in one go.  That is
+a few hundred small dicts for the country pages; a journal of millions of keys
+would need the table written in batches instead.
+"""
+
+from __future__ import annotations
+import json, logging
+from pathlib import Path
+from typing import Iterator
+
+log = logging.getLogger("journal")
+
+
+def _ends_torn(path: Path) -> bool:
+    """True if the file's last line has no newline (a write was cut short)."""
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, 2)
+        return f.read(1) != b"\n"
+
+
+class RecordJournal:
+    def __init__(self, path: Path, key: str = "Country", resume: bool = False):
+        self.path = path
+        self.key = key
+        self.done: set[str] = set()
+        if resume and path.exists():
+            self.done = {rec[key] for rec in self.records()}
+            log.info("Resuming: %d record(s) already in %s", len(self.done), path.name)
+            torn = _ends_torn(path)
+        else:
+            resume, torn = False, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+        if torn:
+            self._f.write("\n")         # keep the next record on its own line
+
+    def records(self) -> Iterator[dict]:
+        """Stream the journal's records (undecodable / torn lines skipped)."""
+        with open(self.path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning("%s:%d: skipping unreadable line", self.path.name, n)
+
+    def append(self, rec: dict) -> None:
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self.done.add(rec[self.key])
+
+    def compact(self, order: list[str] | None = None) -> list[dict]:
+        """
+        Latest record per key; keys in `order` first (in that order), then the rest as journaled.
+        Memory grows with the number of distinct keys (not with re-journaled duplicates).
+        """
+        self._f.flush()
+        latest: dict[str, dict] = {}
+        for rec in self.records():
+            latest.pop(rec[self.key], None)       # re-journaled keys move to their latest position
+            latest[rec[self.key]] = rec
+        if order is None:
+            return list(latest.values())
+        rank = {k: i for i, k in enumerate(order)}
+        return sorted(latest.values(), key=lambda r: rank.get(r[self.key], len(rank)))
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> RecordJournal:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -5,49 +5,195 @@ It:
 2. Loads GDP & Population CSVs (§3.2)
 3. Cleans each dataset  (§4)
 4. Engineers features & X.npy (§5)
+   (or, with --panel, X_<year>.npy for every year of per-year inputs, see panel.py)
+Steps form a small DAG run by scheduler.py; with --jobs N the crawl and the
+GDP / population load + clean overlap.
 Outputs mandated CSVs/PDF (PDF left as TODO).
 """
 
 import logging, argparse, pandas as pd
+import numpy as np
 from pathlib import Path
-import cleaning, feature_engineering as fe
+import cleaning, feature_engineering as fe, io_load, schemas, utils, country_registry
 from logging_conf import configure_logging
-from crawl_demographics import crawl_demographics
-from io_load import load_gdp, load_pop
+from io_load import load_gdp, load_pop, load_demographics, ENGINES, set_engine
+from stage_cache import StageCache, file_digest, code_digest
+from instrument import Instrument
+import report_sink
+from report_sink import REPORT_MODES, get_sink, set_report_mode
+from running_stats import RunningStats
+from scheduler import Scheduler, Stage
 from utils import *
-from paths import (GDP_PER_CAPITA_2021, POPULATION_2021,
-                    DEMOGRAPHICS_RAW_CSV)
+from paths import (ensure_dirs, GDP_PER_CAPITA_2021, POPULATION_2021,
+                    DEMOGRAPHICS_RAW_CSV, X_NPY, RUN_REPORT_JSON)
 
-configure_logging()
 log = logging.getLogger("pipeline")
 
-def run(gdp_csv: Path, pop_csv: Path, force_crawl=False):
+# The crawler (requests, bs4) and the panel pool are imported only when used, so a
+# run on cached demographics starts without them; see import_budget.py.
+
+def run(gdp_csv: Path, pop_csv: Path, force_crawl=False, concurrency=1, parse_workers=0,
+        resume_crawl=False, use_cache=True, table_format="csv", csv_export=True, chunksize=None,
+        out_of_core=False, x_dtype="float64", report: Path | None = None,
+        profile_dir: Path | None = None, panel_src: str | None = None, panel_workers: int | None = None,
+        reports: str = "background", jobs: int = 1, csv_engine: str = "auto", low_memory: bool = False):
+    ensure_dirs()
+    set_table_format(table_format, csv_export=csv_export)
+    set_engine(csv_engine)
+    # previews / describe / audit CSVs go through the report sink, flushed once at the end
+    set_report_mode(reports)
+    cache = StageCache(enabled=use_cache)
+    # per-stage wall/CPU/memory/rows; a no-op unless a report or profiles are requested
+    ins = Instrument(enabled=report is not None or profile_dir is not None, profile_dir=profile_dir)
+    if profile_dir is not None and jobs != 1:
+        log.warning("--profile-dir profiles one stage at a time; running with --jobs 1")
+        jobs = 1
+    sched = None
+    try:
+        sched = Scheduler(_stages(gdp_csv, pop_csv, cache, ins, force_crawl=force_crawl,
+                                  concurrency=concurrency, parse_workers=parse_workers,
+                                  resume_crawl=resume_crawl, chunksize=chunksize, out_of_core=out_of_core,
+                                  x_dtype=x_dtype, panel_src=panel_src, panel_workers=panel_workers,
+                                  low_memory=low_memory),
+                          jobs=jobs)
+        sched.run()
+        sched.log_summary()
+        with ins.stage("report_flush"):
+            get_sink().flush()
+    finally:
+        if report is not None:
+            ins.write(report, cache_hits=sorted(cache.hits),
+                      schedule=sched.summary() if sched is not None else None)
+    log.info("Pipeline completed")
+
+
+def _stages(gdp_csv: Path, pop_csv: Path, cache: StageCache, ins: Instrument, force_crawl=False,
+            concurrency=1, parse_workers=0, resume_crawl=False, chunksize=None, out_of_core=False,
+            x_dtype="float64", panel_src=None, panel_workers=None, low_memory=False) -> list[Stage]:
+    """
+    The pipeline as a DAG:  crawl -> demographics ─┐
+                            gdp ───────────────────┼-> features   (or demographics -> panel)
+                            population ────────────┘
+    """
+    # cached report writes are replayed on a hit, so whether they were made is part of the key;
+    # the registry is not: cached frames are re-keyed from their names on a hit (see _rekey)
+    clean_code = (code_digest(cleaning, utils, country_registry, report_sink) + f"low_memory={low_memory}"
+                  + f"reports={get_sink().enabled}")
+
     # 1  Crawl (or read existing)
-    demo = crawl_demographics() if force_crawl or not DEMOGRAPHICS_RAW_CSV.exists() \
-        else pd.read_csv(DEMOGRAPHICS_RAW_CSV)
+    def crawl():
+        if force_crawl or resume_crawl or not table_path(DEMOGRAPHICS_RAW_CSV).exists():
+            from crawl_demographics import crawl_demographics
+            ins.call("crawl", crawl_demographics, concurrency=concurrency, parse_workers=parse_workers,
+                     resume=resume_crawl)
+        return {"demo_raw": table_path(DEMOGRAPHICS_RAW_CSV)}
 
-    # 2  Load given CSVs
-    gdp = load_gdp(gdp_csv)
-    pop = load_pop(pop_csv)
+    # 2+3  Load given CSVs & clean - each keyed on its input file + code
+    def demographics(demo_raw):
+        demo_key = cache.key("demographics", file_digest(demo_raw), clean_code, code_digest(io_load, schemas))
+        demo = _rekey(cache, "demographics", cache.run("demographics", demo_key, lambda: {
+            "demo": ins.call("clean_demographics", cleaning.clean_demographics,
+                             ins.call("load_demographics", load_demographics, DEMOGRAPHICS_RAW_CSV),
+                             low_memory=low_memory)})["demo"])
+        return {"demo": demo, "demo_key": demo_key}
 
-    # 3  Clean
-    demo_clean = cleaning.clean_demographics(demo)
-    gdp_clean  = cleaning.clean_gdp(gdp)
-    pop_clean  = cleaning.clean_population(pop)
+    # chunksize -> streaming cleaners, peak memory independent of the input size
+    def gdp():
+        gdp_key = cache.key("gdp", file_digest(gdp_csv), clean_code, code_digest(io_load, schemas),
+                            f"chunked={bool(chunksize)}")
+        gdp_clean = _rekey(cache, "gdp", cache.run("gdp", gdp_key, lambda: {
+            "gdp": ins.call("clean_gdp_stream", cleaning.clean_gdp_stream, gdp_csv, chunksize) if chunksize
+                   else ins.call("clean_gdp", cleaning.clean_gdp, ins.call("load_gdp", load_gdp, gdp_csv),
+                             low_memory=low_memory)})["gdp"])
+        return {"gdp": gdp_clean, "gdp_key": gdp_key}
+
+    def population():
+        pop_key = cache.key("population", file_digest(pop_csv), clean_code, code_digest(io_load, schemas),
+                            f"chunked={bool(chunksize)}")
+        pop_clean = _rekey(cache, "population", cache.run("population", pop_key, lambda: {
+            "pop": ins.call("clean_population_stream", cleaning.clean_population_stream, pop_csv, chunksize)
+                   if chunksize else ins.call("clean_population", cleaning.clean_population,
+                                              ins.call("load_pop", load_pop, pop_csv), low_memory=low_memory)})["pop"])
+        return {"pop": pop_clean, "pop_key": pop_key}
+
+    crawl_and_demo = [Stage("crawl", crawl, outputs=("demo_raw",)),
+                      Stage("demographics", demographics, inputs=("demo_raw",), outputs=("demo", "demo_key"))]
+
+    if panel_src is not None:
+        # every year in its own worker; the single-year GDP / population inputs are not used
+        def run_panel(demo):
+            import panel
+            X, index = ins.call("panel", panel.run_panel, panel_src, demo, workers=panel_workers)
+            log.info("Panel run: X_panel shape=%s over %d years", X.shape, index["Year"].nunique())
+        return crawl_and_demo + [Stage("panel", run_panel, inputs=("demo",))]
 
     # 4  Feature engineering
-    X, merged = fe.build_features(demo_clean, gdp_clean, pop_clean)
+    def features(demo, demo_key, gdp, gdp_key, pop, pop_key):
+        _features(demo, gdp, pop, cache, ins, cache.key(
+            "features", demo_key, gdp_key, pop_key, code_digest(fe),
+            f"out_of_core={out_of_core}", f"dtype={x_dtype}", f"low_memory={low_memory}"),
+            out_of_core=out_of_core, x_dtype=x_dtype, low_memory=low_memory)
+
+    return crawl_and_demo + [
+        Stage("gdp", gdp, outputs=("gdp", "gdp_key")),
+        Stage("population", population, outputs=("pop", "pop_key")),
+        Stage("features", features, inputs=("demo", "demo_key", "gdp", "gdp_key", "pop", "pop_key")),
+    ]
+
+
+def _rekey(cache: StageCache, stage: str, df: pd.DataFrame) -> pd.DataFrame:
+    """A cached cleaned frame with its CountryIDs re-resolved against the current registry."""
+    if stage not in cache.hits:
+        return df
+    return df.set_axis(pd.Index(country_registry.get_registry().ids(df["Country"]), name="CountryID"))
+
+
+def _features(demo_clean: pd.DataFrame, gdp_clean: pd.DataFrame, pop_clean: pd.DataFrame,
+              cache: StageCache, ins: Instrument, fe_key: str, out_of_core=False, x_dtype="float64",
+              low_memory=False):
+    rows_in = len(demo_clean) + len(gdp_clean) + len(pop_clean)
+    if out_of_core:
+        # X is streamed into a memmapped X.npy and merged.csv is appended chunk by chunk;
+        # the statistics are accumulated from the same chunks
+        def build_ooc():
+            acc = RunningStats()
+            with ins.stage("build_features_ooc", rows_in=rows_in) as rec:
+                X, _ = fe.build_features_ooc(demo_clean, gdp_clean, pop_clean, dtype=x_dtype,
+                                             merged_csv=Path('merged.csv'), stats=acc)
+                rec["rows_out"] = len(X)
+            return {"X": X, "stats": acc.summary(STATS_FIELDS), "corr": acc.corr()}
+        feats = cache.run("features", fe_key, build_ooc)
+        if "features" in cache.hits:
+            np.save(X_NPY, feats["X"])
+        log.info("Out-of-core run: X shape=%s", feats["X"].shape)
+        _save_stats(feats["stats"], feats["corr"])
+        return
+
+    def build():
+        with ins.stage("build_features", rows_in=rows_in) as rec:
+            X, merged = fe.build_features(demo_clean, gdp_clean, pop_clean, low_memory=low_memory)
+            rec["rows_out"] = len(X)
+        return {"X": X, "merged": merged}
+    feats = cache.run("features", fe_key, build)
+    X, merged = feats["X"], feats["merged"]
+    if "features" in cache.hits:     # keep output/X.npy in sync with the cached matrix
+        np.save(X_NPY, X)
 
     log_metadata("Table after feature engineering", df=merged)
-    merged.to_csv('merged.csv')
+    save_table(merged, Path('merged.csv'), index=True)
+
+    acc = ins.call("stats", numeric_stats, merged, ignore_cols=["Country"])
+    _save_stats(acc.summary(STATS_FIELDS), acc.corr())
 
-    stats = stats_for_numeric_fields(merged, ignore_cols=["Country"])
-    stats.to_csv('merged_stats.csv')
+
+def _save_stats(stats: pd.DataFrame, corr: pd.DataFrame) -> None:
+    save_table(stats, Path('merged_stats.csv'), index=True)
+    save_table(corr, Path('merged_corr.csv'), index=True)
     log.info("Summary statistics per field:\n%s", stats)
 
-    log.info("Pipeline completed")
 
 if __name__ == "__main__":
+    configure_logging()
     ap = argparse.ArgumentParser()
     ap.add_argument("--gdp_csv", required=False, default=GDP_PER_CAPITA_2021,
                     help=f"Path to {GDP_PER_CAPITA_2021.name}")
@@ -55,4 +201,40 @@ if __name__ == "__main__":
                     help=f"Path to {POPULATION_2021.name}")
     ap.add_argument("--force-crawl", action="store_true",
                     help=f"Ignore cached demographics_data.csv")
+    ap.add_argument("--concurrency", type=int, default=1, metavar="N",
+                    help="Number of country pages fetched in parallel when crawling")
+    ap.add_argument("--parse-workers", type=int, default=0, metavar="N",
+                    help="Parse crawled pages in N processes (-1 = one per CPU, 0 = inline)")
+    ap.add_argument("--resume-crawl", action="store_true",
+                    help="Crawl, skipping countries already journaled by an interrupted crawl")
+    ap.add_argument("--table-format", choices=TABLE_FORMATS, default="csv",
+                    help="Storage for intermediate tables: csv, or memory-mapped .feather (needs pyarrow)")
+    ap.add_argument("--no-csv-export", dest="csv_export", action="store_false",
+                    help="With --table-format feather, skip writing the .csv copies")
+    ap.add_argument("--csv-engine", choices=ENGINES, default="auto",
+                    help="Parser for the schema-typed CSV inputs; 'auto' uses pyarrow when installed")
+    ap.add_argument("--chunksize", type=int, default=None, metavar="ROWS",
+                    help="Load & clean the GDP / population CSVs in chunks of ROWS (streaming mode)")
+    ap.add_argument("--out-of-core", action="store_true",
+                    help="Build features chunk by chunk into a memmapped X.npy (bounded memory)")
+    ap.add_argument("--float32", dest="x_dtype", action="store_const", const="float32", default="float64",
+                    help="With --out-of-core, store X.npy as float32")
+    ap.add_argument("--low-memory", action="store_true",
+                    help="Categorical country keys, float32 numerics and single-gather filtering/joins "
+                         "in the cleaners and build_features (X.npy equal within float32 tolerance)")
+    ap.add_argument("--report", type=Path, nargs="?", const=RUN_REPORT_JSON, default=None, metavar="PATH",
+                    help=f"Write a JSON per-stage timing/memory report (default path: {RUN_REPORT_JSON.name})")
+    ap.add_argument("--profile-dir", type=Path, default=None, metavar="DIR",
+                    help="Dump a cProfile file per stage into DIR")
+    ap.add_argument("--panel", dest="panel_src", default=None, metavar="DIR|GLOB",
+                    help="Build X for every year of per-year inputs (e.g. input/years/ or 'input/*_20??.csv')")
+    ap.add_argument("--panel-workers", type=int, default=None, metavar="N",
+                    help="Processes for --panel (default: one per CPU, 0 or 1 = in-process)")
+    ap.add_argument("--reports", choices=REPORT_MODES, default="background",
+                    help="Preview/describe/audit CSVs: written by a background thread (default), "
+                         "synchronously, or not at all (off)")
+    ap.add_argument("--jobs", type=int, default=1, metavar="N",
+                    help="Run independent stages (crawl, GDP, population) on N threads (-1 = one per CPU)")
+    ap.add_argument("--no-cache", dest="use_cache", action="store_false",
+                    help="Recompute every stage, ignoring the stage cache (see stage_cache.py)")
     run(**vars(ap.parse_args()))
@@ -0,0 +1,106 @@
+"""
+Persistent on-disk store of crawled pages, keyed by URL.
+Holds zlib-compressed HTML, ETag / Last-Modified validators, fetch timestamps
+and the last parsed record, so re-crawls can revalidate with conditional GETs
+and re-parsing can run fully offline.
+"""
+
+from __future__ import annotations
+import json, time, zlib, sqlite3, logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+from paths import PAGE_STORE_DB
+
+log = logging.getLogger("store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url            TEXT PRIMARY KEY,
+    key            TEXT,
+    body           BLOB NOT NULL,
+    etag           TEXT,
+    last_modified  TEXT,
+    fetched_at     REAL NOT NULL,
+    record         TEXT,
+    parser_version TEXT
+)
+"""
+
+
+@dataclass
+class StoredPage:
+    url: str
+    key: str | None
+    html: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    record: dict | None
+    parser_version: str | None
+
+
+class PageStore:
+    def __init__(self, path: Path = PAGE_STORE_DB):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(_SCHEMA)
+
+    # ---- reads ---------------------------------------------------------- #
+    @staticmethod
+    def _row_to_page(row) -> StoredPage:
+        url, key, body, etag, lm, ts, rec, ver = row
+        return StoredPage(url, key, zlib.decompress(body).decode("utf-8"), etag, lm, ts,
+                          json.loads(rec) if rec else None, ver)
+
+    def get(self, url: str) -> StoredPage | None:
+        row = self._db.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        return self._row_to_page(row) if row else None
+
+    def pages(self) -> Iterator[StoredPage]:
+        """All keyed pages in insertion order."""
+        for row in self._db.execute("SELECT * FROM pages WHERE key IS NOT NULL ORDER BY rowid"):
+            yield self._row_to_page(row)
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a stored URL (empty if unknown)."""
+        row = self._db.execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    # ---- writes --------------------------------------------------------- #
+    def put(self, url: str, html: str, etag: str | None = None, last_modified: str | None = None,
+            key: str | None = None, record: dict | None = None, parser_version: str | None = None) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, key, zlib.compress(html.encode("utf-8"), 6), etag, last_modified, time.time(),
+             json.dumps(record) if record is not None else None, parser_version))
+        self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark a stored page as revalidated now (server answered 304)."""
+        self._db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        self._db.commit()
+
+    def set_record(self, url: str, record: dict, parser_version: str) -> None:
+        self._db.execute("UPDATE pages SET record = ?, parser_version = ? WHERE url = ?",
+                         (json.dumps(record), parser_version, url))
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> PageStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,116 @@
+"""
+Multi-year panel mode: load -> clean -> build_features for every year of
+per-year GDP / population inputs, one year per worker process.
+
+Input files are matched by name, e.g. gdp_per_capita_2003.csv / population_2003.csv
+(any CSV whose name contains "gdp" or "pop" and a 4-digit year).  The cleaned
+demographics frame is handed to each worker once, through the pool initializer,
+and every country name is registered in the parent before the pool starts, so
+all workers see the same frozen CountryID table and never write the registry.
+
+Outputs (output/panel/): X_<year>.npy per year, X_panel.npy (all years stacked
+row-wise), panel_index.csv (Year, Country of every X_panel row) and the pooled
+panel_stats.csv / panel_corr.csv, merged from each worker's RunningStats.
+"""
+
+from __future__ import annotations
+import os, re, glob, logging
+import numpy as np, pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import cleaning, feature_engineering as fe, country_registry
+from io_load import load_gdp, load_pop
+from running_stats import RunningStats
+from utils import STATS_FIELDS, numeric_stats
+from paths import PANEL_DIR
+
+log = logging.getLogger("panel")
+
+_FILE_RE = re.compile(r"(?P<kind>gdp|pop)\D*?(?P<year>(?:19|20)\d{2})", re.IGNORECASE)
+
+
+def discover_years(source: str | Path) -> dict[int, tuple[Path, Path]]:
+    """{year: (gdp_csv, pop_csv)} from a directory or a glob of per-year CSVs."""
+    source = str(source)
+    files = sorted(Path(source).glob("*.csv")) if os.path.isdir(source) else sorted(map(Path, glob.glob(source)))
+    found: dict[int, dict[str, Path]] = {}
+    for f in files:
+        m = _FILE_RE.search(f.name)
+        if m:
+            found.setdefault(int(m["year"]), {})[m["kind"].lower()] = f
+    years = {}
+    for year, kinds in sorted(found.items()):
+        if {"gdp", "pop"} <= kinds.keys():
+            years[year] = (kinds["gdp"], kinds["pop"])
+        else:
+            log.warning("Skipping %d: no %s file", year, "population" if "gdp" in kinds else "GDP")
+    if not years:
+        raise FileNotFoundError(f"No per-year GDP / population CSV pairs found in {source}")
+    return years
+
+
+def _register_names(years: dict[int, tuple[Path, Path]]) -> None:
+    """Give every (standardized) country name of every year its ID up front."""
+    reg = country_registry.get_registry()
+    for gdp_csv, pop_csv in years.values():
+        for path in (gdp_csv, pop_csv):
+            names = pd.read_csv(path, usecols=["Country"], na_values=["None"])["Country"]
+            reg.ids(cleaning._standardize_country(names)[0])
+
+
+# ---- worker side ---------------------------------------------------------- #
+_DEMO: pd.DataFrame | None = None
+
+
+def _init_worker(demo: pd.DataFrame, registry: country_registry.CountryRegistry) -> None:
+    global _DEMO
+    _DEMO = demo
+    registry.frozen = True
+    country_registry._REGISTRY = registry
+
+
+def _year_features(year: int, gdp_csv: Path, pop_csv: Path,
+                   out_dir: Path) -> tuple[int, np.ndarray, pd.Index, RunningStats]:
+    gdp = cleaning.clean_gdp(load_gdp(gdp_csv, previews=False), dropped_csv=None)
+    pop = cleaning.clean_population(load_pop(pop_csv, previews=False))
+    X, merged = fe.build_features(_DEMO, gdp, pop, x_path=out_dir / f"X_{year}.npy", lost_csv=None)
+    return year, X, merged.index, numeric_stats(merged, ignore_cols=["Country"])
+
+
+def run_panel(source: str | Path, demo_clean: pd.DataFrame, workers: int | None = None,
+              out_dir: Path = PANEL_DIR) -> tuple[np.ndarray, pd.DataFrame]:
+    """
+    Build X for every year found in `source` in a process pool (workers=None -> one
+    per CPU, 0/1 -> in this process).  Returns (stacked X, Year/Country index).
+    """
+    years = discover_years(source)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _register_names(years)
+    reg = country_registry.get_registry()
+    workers = min((os.cpu_count() or 1) if workers is None else workers, len(years))
+    log.info("Panel: %d years (%d-%d) on %d worker(s)", len(years), min(years), max(years), workers)
+
+    if workers <= 1:
+        _init_worker(demo_clean, reg)
+        try:
+            results = [_year_features(y, g, p, out_dir) for y, (g, p) in years.items()]
+        finally:
+            reg.frozen = False
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(demo_clean, reg)) as pool:
+            futs = [pool.submit(_year_features, y, g, p, out_dir) for y, (g, p) in years.items()]
+            results = [f.result() for f in futs]
+
+    results.sort(key=lambda r: r[0])
+    X = np.vstack([x for _, x, _, _ in results])
+    index = pd.DataFrame({"Year": np.repeat([y for y, *_ in results], [len(x) for _, x, _, _ in results]),
+                          "Country": np.concatenate([names.to_numpy(dtype=object) for _, _, names, _ in results])})
+    np.save(out_dir / "X_panel.npy", X)
+    index.to_csv(out_dir / "panel_index.csv", index=False)
+    pooled = RunningStats()
+    for *_, acc in results:
+        pooled.merge(acc)
+    pooled.summary(STATS_FIELDS).to_csv(out_dir / "panel_stats.csv")
+    pooled.corr().to_csv(out_dir / "panel_corr.csv")
+    log.info("Saved panel X_panel.npy shape=%s (%d years) to %s", X.shape, len(results), out_dir)
+    return X, index
@@ -0,0 +1,68 @@
+"""
+Bounded, multi-core parse stage for the crawler.
+Raw page bytes are handed to a process pool while fetch threads keep going;
+at most `depth` pages wait in the pool, so memory is bounded by the queue
+depth rather than by the number of countries.
+"""
+
+from __future__ import annotations
+import os, logging
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Iterator
+
+log = logging.getLogger("parse_pool")
+
+Result = tuple[str, Any, Any]      # (key, return value or exception, caller's meta)
+
+
+class ParsePool:
+    """
+    Runs `fn(*args)` for submitted pages and streams (key, result, meta) back.
+    * workers == 0 parses inline in the calling thread (no extra processes)
+    * workers  < 0 uses one worker per CPU
+    `fn` must be a module-level function so it can be pickled to the workers.
+    """
+
+    def __init__(self, fn: Callable, workers: int = 0, depth: int | None = None):
+        self.fn = fn
+        self.workers = (os.cpu_count() or 1) if workers < 0 else workers
+        self.depth = depth or 2 * max(self.workers, 1)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers else None
+        self._pending: dict[Future, tuple[str, Any]] = {}
+
+    def _collect(self, done) -> Iterator[Result]:
+        for fut in done:
+            key, meta = self._pending.pop(fut)
+            try:
+                yield key, fut.result(), meta
+            except Exception as e:
+                yield key, e, meta
+
+    def submit(self, key: str, *args, meta: Any = None) -> Iterator[Result]:
+        """Queue one page; yields any results that had to be drained to make room."""
+        if self._pool is None:
+            try:
+                yield key, self.fn(*args), meta
+            except Exception as e:
+                yield key, e, meta
+            return
+        while len(self._pending) >= self.depth:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            yield from self._collect(done)
+        self._pending[self._pool.submit(self.fn, *args)] = (key, meta)
+
+    def drain(self) -> Iterator[Result]:
+        """Yield all outstanding results."""
+        while self._pending:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            yield from self._collect(done)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> ParsePool:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,12 +1,15 @@
 """
 Centralized relative-path definitions.
 Change ROOT to move the whole project elsewhere.
+Set PIPELINE_OUT_DIR to redirect every generated file (e.g. for benchmarks).
+Importing this module has no side effects; entry points call ensure_dirs().
 """
+import os
 from pathlib import Path
 
 ROOT      = Path(__file__).resolve().parent.parent
 CODE_DIR  = ROOT / "code"
-OUT_DIR   = ROOT / "output"
+OUT_DIR   = Path(os.environ.get("PIPELINE_OUT_DIR", ROOT / "output"))
 INPUT_DIR = ROOT / "input"
 
 # single source of truth for all mandated output files -----------------------
@@ -24,10 +27,18 @@ DROPPED_GDP_CSV               = OUT_DIR / "dropped_gdp.csv"
 LOST_COUNTRIES_CSV            = OUT_DIR / "lost_countries.csv"
 CLEANING_PDF                  = OUT_DIR / "cleaning_summary.pdf"
 X_NPY                          = OUT_DIR / "X.npy"
+PAGE_STORE_DB                 = OUT_DIR / "page_store.sqlite"
+DEMOGRAPHICS_JOURNAL          = OUT_DIR / "demographics_journal.jsonl"
+CACHE_DIR                     = OUT_DIR / "cache"
+COUNTRY_REGISTRY_CSV          = OUT_DIR / "country_registry.csv"
+RUN_REPORT_JSON               = OUT_DIR / "run_report.json"
+PANEL_DIR                     = OUT_DIR / "panel"          # X_<year>.npy, X_panel.npy, panel_index.csv
+BENCH_BASELINE_JSON           = CODE_DIR / "bench_baseline.json"
 # source for input files: change to relevant paths
 GDP_PER_CAPITA_2021            = INPUT_DIR / "gdp_per_capita_2021.csv"
 POPULATION_2021                = INPUT_DIR / "population_2021.csv"
 
 # ---------------------------------------------------------------------------
-for p in (OUT_DIR,):
-    p.mkdir(parents=True, exist_ok=True)
+def ensure_dirs() -> None:
+    for p in (OUT_DIR,):
+        p.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,134 @@
+"""
+Report sink for side artefacts (previews, describe tables, audit CSVs).
+The pipeline only needs them for the report, so they are queued to one
+background I/O thread instead of being written on the critical path.
+
+Modes:
+* "sync"        write immediately (default; standalone module runs)
+* "background"  FIFO queue drained by a writer thread; flush() once at the end
+* "off"         skip them entirely (production runs: no preview/audit files)
+
+Producers hand over objects they no longer mutate (or a small copy).
+Writes run in submission order, so appending to a file chunk by chunk is safe.
+recording() collects the writes a block submits (per thread), so the stage
+cache can store them with an entry and replay them on a hit.
+"""
+
+from __future__ import annotations
+import time, queue, atexit, logging, threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+log = logging.getLogger("sink")
+
+REPORT_MODES = ("sync", "background", "off")
+
+
+class ReportSink:
+    def __init__(self, mode: str = "sync"):
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unknown report mode {mode!r}; choose from {REPORT_MODES}")
+        self.mode = mode
+        self.written = 0
+        self.busy_s = 0.0                 # time spent writing (off the critical path in background mode)
+        self._errors: list[BaseException] = []
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._local = threading.local()   # .records: writes submitted inside recording()
+        if mode == "background":
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._drain, name="report-sink", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    @property
+    def enabled(self) -> bool:
+        """False in "off" mode: producers can skip building the artefact at all."""
+        return self.mode != "off"
+
+    def _run(self, fn: Callable, args: tuple, kwargs: dict) -> None:
+        t0 = time.perf_counter()
+        try:
+            fn(*args, **kwargs)
+            self.written += 1
+        except Exception as exc:           # surfaced by flush()
+            log.error("Writing report artefact failed: %s", exc)
+            self._errors.append(exc)
+        finally:
+            self.busy_s += time.perf_counter() - t0
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is not None:
+                    self._run(*item)
+            finally:
+                self._queue.task_done()
+            if item is None:
+                return
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> None:
+        """Run fn(*args, **kwargs) now, on the writer thread, or not at all (by mode)."""
+        if self.mode == "off":
+            return
+        records = getattr(self._local, "records", None)
+        if records is not None:
+            records.append((fn, args, kwargs))
+        if self._queue is None:
+            self._run(fn, args, kwargs)
+            if self._errors:
+                raise self._errors.pop()
+        else:
+            self._queue.put((fn, args, kwargs))
+
+    @contextmanager
+    def recording(self) -> Iterator[list[tuple[Callable, tuple, dict]]]:
+        """Collect (fn, args, kwargs) of every write this thread submits inside the block."""
+        outer = getattr(self._local, "records", None)
+        self._local.records = records = []
+        try:
+            yield records
+        finally:
+            self._local.records = outer
+            if outer is not None:
+                outer.extend(records)
+
+    def replay(self, records: list[tuple[Callable, tuple, dict]]) -> None:
+        for fn, args, kwargs in records:
+            self.submit(fn, *args, **kwargs)
+
+    def to_csv(self, obj, path, **kwargs) -> None:
+        self.submit(obj.to_csv, path, **kwargs)
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is written; re-raise the first failure."""
+        if self._queue is not None:
+            self._queue.join()
+        if self.written:
+            log.info("Report sink (%s): %d artefact(s) written, %.3f s of I/O", self.mode, self.written, self.busy_s)
+        if self._errors:
+            err, self._errors = self._errors[0], []
+            raise err
+
+    def close(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = self._queue = None      # anything submitted later is written synchronously
+
+
+_SINK = ReportSink()
+
+
+def get_sink() -> ReportSink:
+    return _SINK
+
+
+def set_report_mode(mode: str) -> ReportSink:
+    """Replace the process-wide sink (the previous one is flushed and closed)."""
+    global _SINK
+    _SINK.flush()
+    _SINK.close()
+    _SINK = ReportSink(mode)
+    return _SINK
@@ -0,0 +1,172 @@
+"""
+Single-pass, mergeable summary statistics.
+One update() per chunk computes, for every column at once: count, missing,
+mean and variance (Welford / Chan merge), min, max, a quantile sketch for the
+(approximate, 1%) median, and the shifted pairwise sums behind a full
+pairwise-complete Pearson correlation matrix.  Accumulators built on
+different chunks or in different worker processes merge() exactly (the
+sketch within its error bound), so the same engine serves in-memory,
+streaming and parallel runs.
+"""
+
+from __future__ import annotations
+import numpy as np, pandas as pd
+from sketch import QuantileSketch
+
+SUMMARY_COLUMNS = ["count", "missing", "mean", "std", "min", "max", "median"]
+
+
+def _as_matrix(data, columns: list | None) -> tuple[np.ndarray, list]:
+    """float64 (rows x cols) copy of the numeric view of `data`; the caller's frame is not touched."""
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    if isinstance(data, pd.DataFrame):
+        columns = list(data.columns) if columns is None else columns
+        cols = []
+        for c in columns:
+            s = data[c]
+            if not pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+                s = pd.to_numeric(s, errors="coerce")
+            cols.append(s.to_numpy(dtype="float64", na_value=np.nan))
+        X = np.column_stack(cols) if cols else np.empty((len(data), 0))
+        return X, columns
+    X = np.asarray(data, dtype="float64")
+    X = X.reshape(len(X), -1)
+    return X, list(range(X.shape[1])) if columns is None else columns
+
+
+class RunningStats:
+    def __init__(self, columns: list | None = None, rel_err: float = 0.01,
+                 quantiles: bool = True, corr: bool = True):
+        self.columns = list(columns) if columns is not None else None
+        self.rel_err = rel_err
+        self.quantiles = quantiles
+        self.with_corr = corr
+        self.rows = 0
+        if self.columns is not None:
+            self._init(len(self.columns))
+
+    def _init(self, k: int) -> None:
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.sketches = [QuantileSketch(self.rel_err) for _ in range(k)] if self.quantiles else None
+        # pairwise sums over rows where both columns are present, of x - shift
+        self.shift = None
+        self._n = self._s = self._q = self._p = np.zeros((k, k))
+
+    # ---- building ------------------------------------------------------- #
+    def update(self, data) -> RunningStats:
+        """Add a chunk (DataFrame, Series or 2-D array); non-numeric values count as missing."""
+        X, columns = _as_matrix(data, self.columns)
+        if self.columns is None:
+            self.columns = columns
+            self._init(len(columns))
+        present = ~np.isnan(X)
+        c = present.sum(axis=0).astype("float64")
+        self.rows += len(X)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cmean = np.where(c > 0, np.where(present, X, 0.0).sum(axis=0) / c, 0.0)
+        cm2 = np.where(present, (X - cmean) ** 2, 0.0).sum(axis=0)
+        self._merge_moments(c, cmean, cm2)
+        self.min = np.minimum(self.min, np.where(present, X, np.inf).min(axis=0, initial=np.inf))
+        self.max = np.maximum(self.max, np.where(present, X, -np.inf).max(axis=0, initial=-np.inf))
+
+        if self.quantiles:
+            for j, sk in enumerate(self.sketches):
+                sk.update(X[:, j])
+        if self.with_corr:
+            if self.shift is None:
+                self.shift = cmean            # ~ the data's location, keeps the sums well conditioned
+            W = present.astype("float64")
+            Xc = np.where(present, X - self.shift, 0.0)
+            self._n = self._n + W.T @ W
+            self._s = self._s + Xc.T @ W
+            self._q = self._q + (Xc * Xc).T @ W
+            self._p = self._p + Xc.T @ Xc
+        return self
+
+    def _merge_moments(self, c: np.ndarray, cmean: np.ndarray, cm2: np.ndarray) -> None:
+        """Chan et al. parallel merge of (count, mean, M2)."""
+        tot = self.count + c
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = np.where(tot > 0, c / tot, 0.0)
+        delta = cmean - self.mean
+        self.m2 = self.m2 + np.where(c > 0, cm2 + delta ** 2 * self.count * frac, 0.0)
+        self.mean = self.mean + np.where(c > 0, delta * frac, 0.0)
+        self.count = tot
+
+    def _shifted_sums(self, shift: np.ndarray) -> tuple[np.ndarray, ...]:
+        """Pairwise sums re-expressed around another shift: x - new = (x - old) - d."""
+        d = shift - self.shift
+        n, s = self._n, self._s
+        q = self._q - 2 * d[:, None] * s + d[:, None] ** 2 * n
+        p = self._p - s * d[None, :] - d[:, None] * s.T + np.outer(d, d) * n
+        return n, s - d[:, None] * n, q, p
+
+    def merge(self, other: RunningStats) -> RunningStats:
+        """Fold another accumulator (same columns) into this one."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.columns = list(other.columns)
+            self._init(len(self.columns))
+        if list(other.columns) != self.columns:
+            raise ValueError("Cannot merge statistics over different columns")
+        self.rows += other.rows
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        if self.quantiles and other.quantiles:
+            for mine, theirs in zip(self.sketches, other.sketches):
+                mine.merge(theirs)
+        if self.with_corr and other.with_corr and other.shift is not None:
+            if self.shift is None:
+                self.shift = other.shift
+            n, s, q, p = other._shifted_sums(self.shift)
+            self._n, self._s, self._q, self._p = self._n + n, self._s + s, self._q + q, self._p + p
+        return self
+
+    # ---- results -------------------------------------------------------- #
+    @property
+    def missing(self) -> np.ndarray:
+        return self.rows - self.count
+
+    @property
+    def var(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    def quantile(self, q: float | list[float]) -> np.ndarray:
+        """Approximate quantile(s) per column: shape (cols,) or (len(q), cols)."""
+        if not self.quantiles:
+            raise ValueError("Accumulator was built with quantiles=False")
+        res = np.array([sk.quantile(q) for sk in self.sketches], dtype="float64")
+        return res if np.isscalar(q) else res.T
+
+    def summary(self, fields: list[str] = SUMMARY_COLUMNS) -> pd.DataFrame:
+        """One row per column: count, missing, mean, std, min, max, median (pick with `fields`)."""
+        empty = self.count == 0
+        table = {
+            "count": self.count.astype("int64"), "missing": self.missing.astype("int64"),
+            "mean": np.where(empty, np.nan, self.mean), "std": np.sqrt(self.var),
+            "min": np.where(empty, np.nan, self.min), "max": np.where(empty, np.nan, self.max),
+        }
+        if "median" in fields:
+            table["median"] = self.quantile(0.5)
+        return pd.DataFrame({f: table[f] for f in fields}, index=pd.Index(self.columns))
+
+    def corr(self) -> pd.DataFrame:
+        """Pearson correlation for every column pair over the rows where both are present."""
+        if not self.with_corr:
+            raise ValueError("Accumulator was built with corr=False")
+        n, s, q, p = self._n, self._s, self._q, self._p
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * p - s * s.T
+            var = n * q - s * s
+            r = cov / np.sqrt(var * var.T)
+        r = np.where(n > 1, np.clip(r, -1.0, 1.0), np.nan)
+        return pd.DataFrame(r, index=self.columns, columns=self.columns)
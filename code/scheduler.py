@@ -0,0 +1,142 @@
+"""
+Dependency-aware stage scheduler for the pipeline.
+A pipeline is a list of Stages, each declaring the named values it consumes
+(`inputs`) and produces (`outputs`).  Every stage starts as soon as the stages
+producing its inputs are done, so independent work (e.g. the crawl and the
+GDP / population cleaning) overlaps on a thread pool of `jobs` workers.
+After the run, the critical path - the chain of stages that bounded the
+wall time - is logged and available for the run report.
+"""
+
+from __future__ import annotations
+import os, time, logging
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Any, Callable
+
+log = logging.getLogger("scheduler")
+
+
+@dataclass
+class Stage:
+    """`fn(**inputs)` returns a dict holding (at least) every name in `outputs`."""
+    name: str
+    fn: Callable[..., dict | None]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+
+
+class Scheduler:
+    """
+    Runs Stages in dependency order.
+    * jobs == 1 runs them one by one in the declared (topological) order
+    * jobs  < 0 uses one thread per CPU
+    Stages share the process (threads, not processes), so they can hand
+    DataFrames to each other without pickling; pandas / numpy / I/O release
+    the GIL for most of the heavy work.
+    """
+
+    def __init__(self, stages: list[Stage], jobs: int = 1):
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("duplicate stage names")
+        self.jobs = (os.cpu_count() or 1) if jobs < 0 else max(1, jobs)
+        self.producer: dict[str, str] = {}
+        for s in stages:
+            for out in s.outputs:
+                if out in self.producer:
+                    raise ValueError(f"{out!r} is produced by both {self.producer[out]!r} and {s.name!r}")
+                self.producer[out] = s.name
+        self.deps: dict[str, set[str]] = {}
+        for s in stages:
+            missing = [i for i in s.inputs if i not in self.producer]
+            if missing:
+                raise ValueError(f"stage {s.name!r} needs {missing} which no stage produces")
+            self.deps[s.name] = {self.producer[i] for i in s.inputs}
+        self.order = self._topological(stages)
+        self.timings: dict[str, tuple[float, float]] = {}      # name -> (start, end), run-relative
+        self.wall_s = 0.0
+
+    def _topological(self, stages: list[Stage]) -> list[str]:
+        order, done = [], set()
+        pending = [s.name for s in stages]
+        while pending:
+            ready = [n for n in pending if self.deps[n] <= done]
+            if not ready:
+                raise ValueError(f"dependency cycle among stages {pending}")
+            for n in ready:
+                order.append(n)
+                done.add(n)
+            pending = [n for n in pending if n not in done]
+        return order
+
+    # ---- execution ------------------------------------------------------ #
+    def _call(self, name: str, values: dict[str, Any], t0: float) -> dict:
+        stage = self.stages[name]
+        start = time.perf_counter() - t0
+        out = stage.fn(**{i: values[i] for i in stage.inputs}) or {}
+        self.timings[name] = (start, time.perf_counter() - t0)
+        missing = [o for o in stage.outputs if o not in out]
+        if missing:
+            raise RuntimeError(f"stage {name!r} did not produce {missing}")
+        return out
+
+    def run(self) -> dict[str, Any]:
+        """Execute every stage; returns all produced values by name."""
+        values: dict[str, Any] = {}
+        t0 = time.perf_counter()
+        if self.jobs == 1:
+            for name in self.order:
+                values.update(self._call(name, values, t0))
+        else:
+            self._run_pool(values, t0)
+        self.wall_s = time.perf_counter() - t0
+        return values
+
+    def _run_pool(self, values: dict[str, Any], t0: float) -> None:
+        done: set[str] = set()
+        running: dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="stage") as pool:
+            try:
+                while len(done) < len(self.order):
+                    for name in self.order:
+                        if name not in done and name not in running.values() and self.deps[name] <= done:
+                            log.debug("start %s", name)
+                            running[pool.submit(self._call, name, dict(values), t0)] = name
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        name = running.pop(fut)
+                        values.update(fut.result())      # re-raises the stage's exception
+                        done.add(name)
+            except BaseException:
+                for fut in running:
+                    fut.cancel()
+                raise
+
+    # ---- summary -------------------------------------------------------- #
+    def critical_path(self) -> list[str]:
+        """Stages that bounded the wall time: walk back from the last to finish via the
+        dependency that finished last."""
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n][1])
+        path = [name]
+        while self.deps[name]:
+            name = max(self.deps[name], key=lambda n: self.timings[n][1])
+            path.append(name)
+        return path[::-1]
+
+    def summary(self) -> dict:
+        path = self.critical_path()
+        busy = sum(end - start for start, end in self.timings.values())
+        return {"jobs": self.jobs, "wall_s": round(self.wall_s, 6), "stage_sum_s": round(busy, 6),
+                "critical_path": [{"stage": n, "start_s": round(self.timings[n][0], 6),
+                                   "wall_s": round(self.timings[n][1] - self.timings[n][0], 6)}
+                                  for n in path]}
+
+    def log_summary(self) -> None:
+        s = self.summary()
+        chain = " -> ".join(f"{p['stage']} ({p['wall_s']:.2f}s)" for p in s["critical_path"])
+        log.info("Critical path: %s", chain)
+        log.info("Wall %.2fs with %d job(s); stages took %.2fs in total (overlap x%.2f)",
+                 s["wall_s"], s["jobs"], s["stage_sum_s"], s["stage_sum_s"] / s["wall_s"] if s["wall_s"] else 1)
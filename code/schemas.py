@@ -0,0 +1,51 @@
+"""
+Declared schemas of the pipeline's CSV inputs.
+A schema names every column the loaders read with its dtype, the NA tokens and
+thousands separator used in the file, and which columns must be present; the
+header is checked against it before the body is read (see io_load.read_table).
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+
+# pandas' default NA tokens plus the "None" the course files use
+NA_TOKENS = ("", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+             "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null")
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    name: str
+    columns: dict[str, str]                 # column -> "string" | "float64" | "int64"
+    required: tuple[str, ...]
+    thousands: str | None = ","
+    na_values: tuple[str, ...] = NA_TOKENS
+
+    @property
+    def numeric(self) -> list[str]:
+        return [c for c, t in self.columns.items() if t != "string"]
+
+    @property
+    def integer(self) -> list[str]:
+        """Counts: int64 when complete, float64 (NaN) when values are missing."""
+        return [c for c, t in self.columns.items() if t == "int64"]
+
+    def missing(self, header: list[str]) -> list[str]:
+        return [c for c in self.required if c not in header]
+
+
+GDP_SCHEMA = TableSchema(
+    "gdp", {"Country": "string", "GDP_per_capita_PPP": "float64"},
+    required=("Country", "GDP_per_capita_PPP"))
+
+POP_SCHEMA = TableSchema(
+    "population", {"Country": "string", "Population": "int64"},
+    required=("Country", "Population"))
+
+# demographics_data.csv as written by the crawler (crawl_demographics.FIELD_PATTERNS)
+DEMOGRAPHICS_SCHEMA = TableSchema(
+    "demographics",
+    {"LifeExpectancy_Both": "float64", "LifeExpectancy_Female": "float64", "LifeExpectancy_Male": "float64",
+     "UrbanPopulation_Percentage": "float64", "UrbanPopulation_Absolute": "float64",
+     "PopulationDensity": "float64", "Country": "string"},
+    required=("Country", "LifeExpectancy_Both"))
@@ -0,0 +1,102 @@
+"""
+Mergeable quantile sketch (DDSketch-style log-bucket histogram).
+Every quantile it returns is within `rel_err` relative error of the exact
+value; memory depends on the value range, not on the number of rows, and two
+sketches built on different chunks merge by adding their bucket counts.
+"""
+
+from __future__ import annotations
+import math
+import numpy as np
+
+
+class QuantileSketch:
+    def __init__(self, rel_err: float = 0.01):
+        if not 0 < rel_err < 1:
+            raise ValueError("rel_err must be in (0, 1)")
+        self.rel_err = rel_err
+        self.gamma = (1 + rel_err) / (1 - rel_err)
+        self._log_gamma = math.log(self.gamma)
+        self._pos: dict[int, int] = {}     # bucket -> count, for x > 0
+        self._neg: dict[int, int] = {}     # bucket of |x|, for x < 0
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # ---- building ------------------------------------------------------- #
+    def _buckets(self, x: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(x) / self._log_gamma).astype(np.int64)
+
+    @staticmethod
+    def _add_counts(store: dict[int, int], keys: np.ndarray) -> None:
+        if keys.size:
+            uniq, cnt = np.unique(keys, return_counts=True)
+            for k, c in zip(uniq.tolist(), cnt.tolist()):
+                store[k] = store.get(k, 0) + c
+
+    def update(self, values) -> QuantileSketch:
+        """Add a batch of values (NaNs ignored)."""
+        x = np.asarray(values, dtype="float64")
+        x = x[~np.isnan(x)]
+        if not x.size:
+            return self
+        self._add_counts(self._pos, self._buckets(x[x > 0]))
+        self._add_counts(self._neg, self._buckets(-x[x < 0]))
+        self.zeros += int((x == 0).sum())
+        self.count += x.size
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        return self
+
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different rel_err")
+        for mine, theirs in ((self._pos, other._pos), (self._neg, other._neg)):
+            for k, c in theirs.items():
+                mine[k] = mine.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # ---- queries -------------------------------------------------------- #
+    def _value(self, key: int) -> float:
+        """Representative value of a bucket (relative error <= rel_err)."""
+        return 2 * self.gamma ** key / (1 + self.gamma)
+
+    def _ordered(self) -> list[tuple[float, int]]:
+        """(value, count) for every bucket in ascending value order."""
+        out = [(-self._value(k), self._neg[k]) for k in sorted(self._neg, reverse=True)]
+        if self.zeros:
+            out.append((0.0, self.zeros))
+        out += [(self._value(k), self._pos[k]) for k in sorted(self._pos)]
+        return out
+
+    def quantile(self, q: float | list[float]) -> float | list[float]:
+        qs = [q] if np.isscalar(q) else list(q)
+        if self.count == 0:
+            res = [math.nan] * len(qs)
+            return res[0] if np.isscalar(q) else res
+        buckets = self._ordered()
+        cum = np.cumsum([c for _, c in buckets])
+        res = []
+        for p in qs:
+            if not 0 <= p <= 1:
+                raise ValueError("quantile must be in [0, 1]")
+            rank = p * (self.count - 1)
+            i = int(np.searchsorted(cum, rank, side="right"))
+            v = buckets[min(i, len(buckets) - 1)][0]
+            res.append(min(max(v, self.min), self.max))
+        return res[0] if np.isscalar(q) else res
+
+    def rank(self, x: float, strict: bool = True) -> int:
+        """Approximate number of values < x (or <= x with strict=False)."""
+        n = 0
+        for v, c in self._ordered():
+            if v < x or (not strict and v == x):
+                n += c
+            else:
+                break
+        return n
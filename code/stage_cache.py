@@ -0,0 +1,156 @@
+"""
+Content-addressed cache for pipeline stages.
+An entry is keyed by the stage name, the content hashes of the stage's input
+files and the source of the modules that implement it, so any change to data
+or code produces a new key.  Entries hold the stage's frames (pickle, dtypes
+and index preserved) and arrays (.npy), plus the report-sink writes the stage
+made (previews, describe / audit CSVs), which are replayed on a hit so those
+files always describe the inputs the cached frames came from.
+
+Inspect / evict:  python stage_cache.py list | evict [--stage S] [--older-than DAYS]
+"""
+
+from __future__ import annotations
+import json, time, shutil, hashlib, logging
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable
+import numpy as np, pandas as pd
+from paths import CACHE_DIR
+from report_sink import get_sink
+from logging_conf import configure_logging
+
+log = logging.getLogger("cache")
+
+CACHE_VERSION = "2"      # bump to invalidate every entry after a format change
+
+Artefacts = dict[str, Any]   # name -> pd.DataFrame | np.ndarray
+REPORTS = "_reports"         # entry artefact holding the recorded report-sink writes
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def code_digest(*modules: ModuleType) -> str:
+    """Hash of the source files of the modules a stage depends on."""
+    h = hashlib.sha256(CACHE_VERSION.encode())
+    for m in modules:
+        h.update(Path(m.__file__).read_bytes())
+    return h.hexdigest()
+
+
+class StageCache:
+    def __init__(self, root: Path = CACHE_DIR, enabled: bool = True):
+        self.root = root
+        self.enabled = enabled
+        self.hits: set[str] = set()     # stages served from cache during this run
+
+    @staticmethod
+    def key(stage: str, *parts: str) -> str:
+        return hashlib.sha256("\n".join((stage,) + parts).encode()).hexdigest()
+
+    def _dir(self, stage: str, key: str) -> Path:
+        return self.root / f"{stage}-{key[:16]}"
+
+    # ---- entries -------------------------------------------------------- #
+    def get(self, stage: str, key: str) -> Artefacts | None:
+        d = self._dir(stage, key)
+        meta_path = d / "meta.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        if meta["key"] != key:
+            return None
+        out: Artefacts = {}
+        for name, kind in meta["artefacts"].items():
+            out[name] = (np.load(d / f"{name}.npy", mmap_mode="r") if kind == "array"     # arrays stay on disk
+                         else pd.read_pickle(d / f"{name}.pkl"))
+        return out
+
+    def put(self, stage: str, key: str, artefacts: Artefacts) -> None:
+        d = self._dir(stage, key)
+        tmp = d.with_name(d.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        kinds = {}
+        for name, obj in artefacts.items():
+            if isinstance(obj, pd.DataFrame):
+                obj.to_pickle(tmp / f"{name}.pkl")
+                kinds[name] = "frame"
+            elif not isinstance(obj, np.ndarray):
+                pd.to_pickle(obj, tmp / f"{name}.pkl")
+                kinds[name] = "object"
+            else:
+                np.save(tmp / f"{name}.npy", obj)
+                kinds[name] = "array"
+        meta = {"stage": stage, "key": key, "created": time.time(), "artefacts": kinds}
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+        shutil.rmtree(d, ignore_errors=True)
+        tmp.rename(d)       # entry appears atomically, never half-written
+
+    def run(self, stage: str, key: str, compute: Callable[[], Artefacts]) -> Artefacts:
+        """Load the stage's artefacts if cached, else compute and store them."""
+        sink = get_sink()
+        if self.enabled:
+            hit = self.get(stage, key)
+            if hit is not None:
+                log.info("Cache hit  %-12s %s", stage, key[:12])
+                self.hits.add(stage)
+                sink.replay(hit.pop(REPORTS, []))
+                return hit
+        with sink.recording() as reports:
+            out = compute()
+        if self.enabled:
+            self.put(stage, key, {**out, REPORTS: reports})
+            log.info("Cache miss %-12s %s (stored)", stage, key[:12])
+        return out
+
+    # ---- inspection / eviction ------------------------------------------ #
+    def entries(self) -> list[dict]:
+        out = []
+        for meta_path in sorted(self.root.glob("*/meta.json")):
+            meta = json.loads(meta_path.read_text())
+            meta["path"] = meta_path.parent
+            meta["bytes"] = sum(p.stat().st_size for p in meta_path.parent.iterdir())
+            out.append(meta)
+        return out
+
+    def evict(self, stage: str | None = None, older_than: float | None = None) -> int:
+        """Delete entries (optionally only for `stage` / older than `older_than` seconds)."""
+        now, n = time.time(), 0
+        for e in self.entries():
+            if stage and e["stage"] != stage:
+                continue
+            if older_than is not None and now - e["created"] < older_than:
+                continue
+            shutil.rmtree(e["path"])
+            n += 1
+        log.info("Evicted %d cache entries", n)
+        return n
+
+
+if __name__ == "__main__":
+    configure_logging()
+    import argparse
+    ap = argparse.ArgumentParser(description="Inspect or evict pipeline stage-cache entries")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="List cached entries")
+    ev = sub.add_parser("evict", help="Delete cached entries (all by default)")
+    ev.add_argument("--stage", help="Only entries of this stage")
+    ev.add_argument("--older-than", type=float, metavar="DAYS", help="Only entries older than DAYS")
+    args = ap.parse_args()
+
+    cache = StageCache()
+    if args.cmd == "list":
+        for e in cache.entries():
+            age = (time.time() - e["created"]) / 86400
+            print(f"{e['stage']:<14} {e['key'][:16]}  {e['bytes'] / 1024:8.1f} KiB  {age:6.2f} days  "
+                  f"{', '.join(e['artefacts'])}")
+    else:
+        cache.evict(stage=args.stage,
+                    older_than=args.older_than * 86400 if args.older_than is not None else None)
@@ -0,0 +1,155 @@
+"""
+Synthetic data generator for benchmarks.
+Produces GDP, population and demographics tables shaped like the real inputs,
+at any scale, with injected duplicates, NaNs, comma-formatted numbers and
+country-name variants ("the X", odd case/spacing, accents, "&"), plus
+Worldometer-like country HTML pages for the crawler's parser.
+
+    python synth.py --rows 100000 --pages 200 --out /tmp/synth
+"""
+
+from __future__ import annotations
+import os, atexit, shutil, tempfile, logging, argparse
+import numpy as np, pandas as pd
+from pathlib import Path
+from logging_conf import configure_logging
+
+log = logging.getLogger("synth")
+
+_STEMS = ["Norland", "Costa Verde", "Saint Ives", "Cote d'Azur", "Trinidad and Tobago",
+          "Republic of Ostia", "New Aldera", "Upper Vales", "Marisol", "Bay Islands"]
+
+
+def use_temp_out_dir() -> None:
+    """
+    Point PIPELINE_OUT_DIR at a fresh temporary directory, removed at exit, unless the
+    user set it (then it is kept). Benchmarks call this before importing any module
+    that imports paths.py, so generated files never land in output/.
+    """
+    if "PIPELINE_OUT_DIR" not in os.environ:
+        os.environ["PIPELINE_OUT_DIR"] = tempfile.mkdtemp(prefix="pipeline-bench-")
+        atexit.register(shutil.rmtree, os.environ["PIPELINE_OUT_DIR"], ignore_errors=True)
+
+
+def country_names(n: int, rng: np.random.Generator) -> np.ndarray:
+    """n distinct canonical names, e.g. 'Norland 17'."""
+    stems = np.array(_STEMS, dtype=object)[np.arange(n) % len(_STEMS)]
+    return stems + " " + (np.arange(n) // len(_STEMS)).astype(str).astype(object)
+
+
+def _variants(names: np.ndarray, frac: float, rng: np.random.Generator) -> np.ndarray:
+    """Spell a fraction of names the way messy sources do."""
+    out = names.copy()
+    idx = np.flatnonzero(rng.random(len(out)) < frac)
+    kinds = rng.integers(0, 5, size=len(idx))
+    for i, k in zip(idx.tolist(), kinds.tolist()):
+        s = out[i]
+        out[i] = ("The " + s, s.lower(), f"  {s.upper()} ",
+                  s.replace("Cote", "Côte"), s.replace(" and ", " & "))[k]
+    return out
+
+
+def _keys(rows: int, n_countries: int, dup_frac: float, rng: np.random.Generator) -> np.ndarray:
+    """Country index per row: mostly a permutation, `dup_frac` of rows repeat another country."""
+    keys = rng.permutation(rows) % n_countries
+    dup = rng.random(rows) < dup_frac
+    keys[dup] = rng.integers(0, n_countries, size=int(dup.sum()))
+    return keys
+
+
+def _with_nans(values: np.ndarray, frac: float, rng: np.random.Generator) -> np.ndarray:
+    values = values.astype("float64")
+    values[rng.random(len(values)) < frac] = np.nan
+    return values
+
+
+def _commas(values: np.ndarray, frac: float, rng: np.random.Generator) -> np.ndarray:
+    """Render a fraction of numbers with thousands separators, as object strings."""
+    out = values.astype(object)
+    idx = np.flatnonzero((rng.random(len(values)) < frac) & ~np.isnan(values))
+    out[idx] = [f"{v:,.2f}" for v in values[idx]]
+    return out
+
+
+def make_tables(rows: int, seed: int = 0, dup_frac: float = 0.02, nan_frac: float = 0.01,
+                variant_frac: float = 0.05) -> dict[str, pd.DataFrame]:
+    """{'gdp', 'pop', 'demo'} frames with `rows` rows each (column layout of the real inputs)."""
+    rng = np.random.default_rng(seed)
+    n_countries = max(1, int(rows * (1 - dup_frac)))
+    names = country_names(n_countries, rng)
+
+    def col_names(keys):
+        return _variants(names[keys], variant_frac, rng)
+
+    gdp_keys, pop_keys, demo_keys = (_keys(rows, n_countries, dup_frac, rng) for _ in range(3))
+    gdp = pd.DataFrame({
+        "Country": col_names(gdp_keys),
+        "GDP_per_capita_PPP": _commas(_with_nans(rng.lognormal(9.5, 1.0, rows), nan_frac, rng), 0.1, rng)})
+    pop = pd.DataFrame({
+        "Country": col_names(pop_keys),
+        "Population": _with_nans(np.round(rng.lognormal(15.5, 2.0, rows)) + 1e3, nan_frac, rng)})
+
+    life = rng.normal(72, 8, rows).clip(35, 95)
+    urban_pct = rng.uniform(10, 100, rows)
+    demo = pd.DataFrame({
+        "LifeExpectancy_Both": _with_nans(life.round(1), nan_frac, rng),
+        "LifeExpectancy_Female": (life + rng.uniform(1, 6, rows)).round(1),
+        "LifeExpectancy_Male": (life - rng.uniform(1, 6, rows)).round(1),
+        "UrbanPopulation_Percentage": urban_pct.round(1),
+        "UrbanPopulation_Absolute": np.round(rng.lognormal(14, 2, rows)),
+        "PopulationDensity": rng.lognormal(4, 1.2, rows).round(),
+        "Country": col_names(demo_keys)})
+    return {"gdp": gdp, "pop": pop, "demo": demo}
+
+
+def country_page(name: str, rec: dict, padding: int = 800) -> str:
+    """A Worldometer-like country page carrying the six fields the crawler extracts."""
+    filler = "".join(f"<tr><td>Year {1950 + j}</td><td>{j * 12_345:,}</td></tr>" for j in range(padding))
+    return (
+        f"<html><head><title>{name} Demographics</title><script>var x = 1;</script>"
+        f"<style>td {{ color: #333 }}</style></head><body><h1>{name} Demographics</h1>"
+        f"<table>{filler}</table>"
+        f"<h2>Life Expectancy</h2><div><span>Both Sexes</span> <b>{rec['LifeExpectancy_Both']}</b> years</div>"
+        f"<div><span>Females</span> <b>{rec['LifeExpectancy_Female']}</b> years</div>"
+        f"<div><span>Males</span> <b>{rec['LifeExpectancy_Male']}</b> years</div>"
+        f"<h2>Urban Population</h2><p>{rec['UrbanPopulation_Percentage']} % of the population is urban "
+        f"({int(rec['UrbanPopulation_Absolute']):,} people in 2023)</p>"
+        f"<h2>Population Density</h2><p>The population density in {name} is "
+        f"{int(rec['PopulationDensity'])} people per Km2</p></body></html>")
+
+
+def make_pages(demo: pd.DataFrame, n: int) -> dict[str, str]:
+    """{country: html} for the first n demographics rows."""
+    return {r["Country"]: country_page(r["Country"], r) for r in demo.head(n).to_dict("records")}
+
+
+def write_dataset(out: Path, rows: int, pages: int = 0, seed: int = 0, **kwargs) -> dict[str, Path]:
+    out.mkdir(parents=True, exist_ok=True)
+    tables = make_tables(rows, seed=seed, **kwargs)
+    files = {}
+    for name, df in tables.items():
+        files[name] = out / f"{name}.csv"
+        df.to_csv(files[name], index=False)
+    if pages:
+        page_dir = out / "pages"
+        page_dir.mkdir(exist_ok=True)
+        for i, html in enumerate(make_pages(tables["demo"], pages).values()):
+            (page_dir / f"page_{i:05d}.html").write_text(html, encoding="utf-8")
+        files["pages"] = page_dir
+    log.info("Wrote synthetic dataset (%d rows, %d pages) to %s", rows, pages, out)
+    return files
+
+
+if __name__ == "__main__":
+    configure_logging()
+    ap = argparse.ArgumentParser(description="Generate synthetic pipeline inputs")
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--pages", type=int, default=0, help="Also write N synthetic country pages")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--dup-frac", type=float, default=0.02)
+    ap.add_argument("--nan-frac", type=float, default=0.01)
+    ap.add_argument("--variant-frac", type=float, default=0.05)
+    ap.add_argument("--out", type=Path, required=True)
+    args = ap.parse_args()
+    write_dataset(args.out, args.rows, pages=args.pages, seed=args.seed, dup_frac=args.dup_frac,
+                  nan_frac=args.nan_frac, variant_frac=args.variant_frac)
@@ -2,18 +2,73 @@
 provides util functions to handle stat logs, loading dataframes and such.
 """
 from __future__ import annotations
+import numpy as np
 import pandas as pd
 import logging
 from pathlib import Path
-from logging_conf import configure_logging
+from report_sink import get_sink
+from running_stats import RunningStats
 
-configure_logging()
 log = logging.getLogger("utils")
 
+# --------------------------------------------------------------------------- #
+#  Table storage: CSV (default) or columnar Arrow IPC / Feather
+# --------------------------------------------------------------------------- #
+TABLE_FORMATS = ("csv", "feather")
+TABLE_FORMAT  = "csv"
+CSV_EXPORT    = True      # in feather mode, still write the .csv next to it
 
-def load_df(path: Path) -> pd.DataFrame:
-    log.debug(f'Reading {path.name} file')
-    df = pd.read_csv(path, na_values=["None"])
+
+def set_table_format(fmt: str, csv_export: bool = True) -> None:
+    """Select how intermediate tables are written / preferably read."""
+    global TABLE_FORMAT, CSV_EXPORT
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format {fmt!r}; choose from {TABLE_FORMATS}")
+    if fmt == "feather":
+        import pyarrow  # noqa: F401  - optional dependency, fail early if missing
+    TABLE_FORMAT, CSV_EXPORT = fmt, csv_export
+
+
+def columnar_path(path: Path) -> Path:
+    return path.with_suffix(".feather")
+
+
+def table_path(path: Path) -> Path:
+    """
+    The file load_df will actually read for `path`: the copy in the preferred format,
+    unless the other one is newer (written by a run in the other format) or the only one.
+    """
+    col = columnar_path(path)
+    if not col.exists():
+        return path
+    if not path.exists():
+        return col
+    preferred, other = (col, path) if TABLE_FORMAT == "feather" else (path, col)
+    return other if other.stat().st_mtime > preferred.stat().st_mtime else preferred
+
+
+def save_table(df: pd.DataFrame, path: Path, index: bool = False) -> None:
+    """Write `df` to `path` (CSV) and/or its uncompressed .feather sibling."""
+    if TABLE_FORMAT == "feather":
+        import pyarrow as pa, pyarrow.feather as feather
+        out = df.reset_index() if index else df
+        # uncompressed so readers can memory-map the columns without copying
+        feather.write_feather(pa.Table.from_pandas(out, preserve_index=False),
+                              columnar_path(path), compression="uncompressed")
+        log.debug(f"Wrote {columnar_path(path).name}")
+        if not CSV_EXPORT:
+            return
+    df.to_csv(path, index=index)
+
+
+def load_df(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """Read a table; `columns` projects to just those columns (read from disk only)."""
+    src = table_path(path)
+    log.debug(f'Reading {src.name} file')
+    if src.suffix == ".feather":
+        import pyarrow.feather as feather
+        return feather.read_table(src, columns=columns, memory_map=True).to_pandas(split_blocks=True)
+    df = pd.read_csv(src, na_values=["None"], usecols=columns)
     return df
 
 def log_metadata(name: str, df: pd.DataFrame) -> None:
@@ -21,29 +76,48 @@ def log_metadata(name: str, df: pd.DataFrame) -> None:
     log.info(f"{name} shape  : {df.shape}")
 
 
+def smallest_rows(df: pd.DataFrame, n: int, col: str) -> pd.DataFrame:
+    """
+    df.sort_values(col, kind="stable").head(n) by partial selection (argpartition):
+    O(len(df)) instead of a full sort; missing keys come last, ties keep row order.
+    """
+    keys = df[col].to_numpy(dtype=object)
+    valid = np.flatnonzero(pd.notna(keys))
+    if len(valid) > n:
+        vals = keys[valid]
+        kth = vals[np.argpartition(vals, n - 1)[n - 1]]
+        below, equal = valid[vals < kth], valid[vals == kth]
+        valid = np.concatenate([below, equal[:n - len(below)]])
+    order = sorted(valid.tolist(), key=lambda i: keys[i])         # stable: ties keep row order
+    if len(order) < n:
+        order += np.flatnonzero(pd.isna(keys))[:n - len(order)].tolist()
+    return df.iloc[order]
+
 def store_head(df: pd.DataFrame, head: int, path: Path, sorted: str|None = None) -> None:
-    if sorted:
-        df = df.sort_values(sorted)
-    df.head(head).to_csv(path, index=False)
+    """Preview file, written through the report sink (skipped when reports are off)."""
+    sink = get_sink()
+    if not sink.enabled:
+        return
+    rows = smallest_rows(df, head, sorted) if sorted else df.head(head)
+    sink.to_csv(rows.copy(), path, index=False)      # small copy: the caller keeps mutating df
     log.info(f"Saved {head} first rows {'sorted' if sorted else ''} to {path.name}")
 
 
-def stats_for_numeric_fields(df: pd.DataFrame, ignore_cols: list[str]) -> pd.DataFrame:
-    ### Convert all numeric fields to float for analysis
-    numeric_cols = [col for col in df.columns if col not in ignore_cols]
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+STATS_FIELDS = ["mean", "std", "min", "max", "median", "missing"]     # merged_stats.csv layout
 
-    ### Compute and log required stats
-    stats = df[numeric_cols].agg(['mean', 'std', 'min', 'max', 'median']).transpose()
-    stats["missing"] = df[numeric_cols].isna().sum()
+def numeric_stats(df: pd.DataFrame, ignore_cols: list[str]) -> RunningStats:
+    """One pass over all other columns (non-numeric values count as missing); df is not modified."""
+    return RunningStats([col for col in df.columns if col not in ignore_cols]).update(df)
 
-    return stats
+def stats_for_numeric_fields(df: pd.DataFrame, ignore_cols: list[str]) -> pd.DataFrame:
+    """mean / std / min / max / median / missing per field (median from a sketch: within 1% of a middle value)."""
+    return numeric_stats(df, ignore_cols).summary(STATS_FIELDS)
 
 def pearson_correlation(df: pd.DataFrame, colA_name: str, colB_name: str) -> pd.DataFrame:
     ### Pearson correlation
     if df[colA_name].notna().any() and df[colB_name].notna().any():
-        corr = df[colA_name].corr(df[colB_name])
-        return corr
+        acc = RunningStats([colA_name, colB_name], quantiles=False).update(df)
+        return acc.corr().loc[colA_name, colB_name]
     else:
         log.warning("Could not compute correlation: one or both columns contain only NaNs")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()